@@ -1,19 +1,47 @@
+import asyncio
 import os
+import signal
 
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 
 from bot.log import logger
-from database import initialize_db
+from bot.mongodb import close_mongodb, flush_deleted_messages
+from database import close_db, flush_pending_writes, initialize_db
 
 GUILD_ID = 1110531063161299074
 BOT_LOG = 1112049391482703873
 GENERAL_CHANNEL = 1110531063744303138
 OFFTOPIC_CHANNEL = 1112048063448617142
 
+
+class AWBot(commands.Bot):
+    async def setup_hook(self):
+        # discord.py only handles KeyboardInterrupt, and as PID 1 in the
+        # container the process would otherwise ignore SIGTERM until killed
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.request_close, sig)
+            except NotImplementedError:
+                # Not supported on Windows
+                pass
+
+    def request_close(self, sig):
+        logger.info("Received %s, shutting down", signal.Signals(sig).name)
+        self.closing = asyncio.create_task(self.close())
+
+    async def close(self):
+        # Unloads the extensions, which run their teardown, then disconnects.
+        # Nothing is buffered after that, so what is left is written out here.
+        await super().close()
+        await flush_deleted_messages()
+        await flush_pending_writes()
+
+
 intents = discord.Intents.all()
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot = AWBot(command_prefix="!", intents=intents)
 
 # Load environment variables from .env file (if it exists)
 load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
@@ -45,3 +73,6 @@ async def on_ready():
 
 
 bot.run(os.getenv("BOT_TOKEN"), log_handler=None)
+
+close_mongodb()
+close_db()
@@ -0,0 +1,99 @@
+"""
+Compares the old LOWER(aka) = LOWER(?) scan with the NOCASE index lookup and
+the aka_fts trigram search on a synthetic aka_list table.
+
+Usage: python -m benchmarks.aka_search [rows]
+"""
+
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+from database.akas import trigram_query
+from database.connection import Database
+from database.migrations import apply_migrations
+
+SCHEMA = os.path.join(os.path.dirname(__file__), "..", "database", "schema.sql")
+
+
+def random_aka(rng):
+    return "".join(
+        rng.choices(string.ascii_lowercase + string.digits, k=rng.randint(4, 14))
+    )
+
+
+def populate(db, rows, rng):
+    with open(SCHEMA, "r") as f:
+        schema = f.read()
+    with db.cursor() as cursor:
+        cursor.executescript(schema)
+    apply_migrations(db)
+
+    akas = list(dict.fromkeys(random_aka(rng) for _ in range(rows)))
+    with db.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO aka_list (aka, response) VALUES (?, ?)",
+            ((aka, f"response for {aka}") for aka in akas),
+        )
+    return akas
+
+
+def typo(aka, rng):
+    i = rng.randrange(len(aka))
+    return aka[:i] + rng.choice(string.ascii_lowercase) + aka[i + 1 :]
+
+
+def bench(db, sql, params_list):
+    start = time.perf_counter()
+    with db.cursor() as cursor:
+        for params in params_list:
+            cursor.execute(sql, params)
+            cursor.fetchall()
+    return (time.perf_counter() - start) / len(params_list)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        akas = populate(db, rows, rng)
+        queries = [rng.choice(akas).upper() for _ in range(500)]
+        typos = [typo(rng.choice(akas), rng) for _ in range(500)]
+
+        results = {
+            "LOWER() scan, exact": bench(
+                db,
+                "SELECT response FROM aka_list WHERE LOWER(aka) = LOWER(?) LIMIT 1",
+                [(q,) for q in queries[:50]],
+            ),
+            "NOCASE index, exact": bench(
+                db,
+                "SELECT response FROM aka_list WHERE aka = ? COLLATE NOCASE LIMIT 1",
+                [(q,) for q in queries],
+            ),
+            "trigram FTS, fuzzy": bench(
+                db,
+                """
+                SELECT aka_list.aka, aka_list.response
+                FROM aka_fts JOIN aka_list ON aka_list.id = aka_fts.rowid
+                WHERE aka_fts MATCH ?
+                ORDER BY aka_list.aka = ? COLLATE NOCASE DESC, aka_fts.rank
+                LIMIT 6
+                """,
+                [(trigram_query(q), q) for q in typos],
+            ),
+        }
+        db.close()
+
+    print(f"rows={len(akas)}")
+    for name, seconds in results.items():
+        print(f"{name:<22} {seconds * 1e6:>10.1f} us/query")
+
+
+if __name__ == "__main__":
+    main()
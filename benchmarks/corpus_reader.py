@@ -0,0 +1,114 @@
+"""
+Compares peak RSS and throughput of loading the whole messages corpus into a
+list (read_messages_from_collection) with streaming it in batches
+(iter_messages_from_collection).
+
+Needs a reachable MongoDB, MONGO_URI or mongodb://localhost:27017 by default.
+A synthetic corpus is written to a throwaway database that is dropped afterwards.
+Each mode runs in its own process, so their peak RSS does not mix.
+
+Usage: python -m benchmarks.corpus_reader [documents] [batch_size]
+"""
+
+import random
+import resource
+import subprocess
+import sys
+import time
+
+from bot.mongodb.load_db import (
+    close_mongodb_client,
+    get_mongodb_client,
+    iter_messages_from_collection,
+    read_messages_from_collection,
+)
+
+DATABASE = "discord_bot_benchmark"
+COLLECTION = "messages"
+
+WORDS = ["iw4x", "mw2", "server", "lag", "when", "update", "aimbot", "gg", "lol"]
+
+
+def populate(documents):
+    col = get_mongodb_client()[DATABASE][COLLECTION]
+    col.drop()
+
+    rng = random.Random(42)
+    batch = []
+    for i in range(documents):
+        words = rng.choices(WORDS, k=rng.randint(3, 30))
+        batch.append({"message": " ".join(words), "author": i % 5000})
+        if len(batch) == 10_000:
+            col.insert_many(batch)
+            batch = []
+    if batch:
+        col.insert_many(batch)
+
+
+def peak_rss_mib():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(mode, batch_size):
+    start = time.perf_counter()
+    count = 0
+    characters = 0
+
+    if mode == "list":
+        messages = read_messages_from_collection(DATABASE, COLLECTION)
+        for message in messages:
+            count += 1
+            characters += len(message)
+    else:
+        for batch in iter_messages_from_collection(
+            batch_size, database=DATABASE, collection=COLLECTION
+        ):
+            for doc in batch:
+                count += 1
+                characters += len(doc["message"])
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"{mode:<8} {count:>9} docs   {count / elapsed:>10.0f} docs/s"
+        f"   peak RSS {peak_rss_mib():>8.1f} MiB"
+    )
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--run":
+        run(sys.argv[2], int(sys.argv[3]))
+        return
+
+    documents = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    client = get_mongodb_client()
+    try:
+        client.admin.command("ping")
+    except Exception as e:
+        print(f"MongoDB is not reachable: {e}")
+        return
+
+    try:
+        print(f"Writing {documents} documents...")
+        populate(documents)
+        for mode in ("list", "stream"):
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.corpus_reader",
+                    "--run",
+                    mode,
+                    str(batch_size),
+                ],
+                check=True,
+            )
+    finally:
+        client.drop_database(DATABASE)
+        close_mongodb_client()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Compares the old per-channel history scan used for duplicate detection with the
+in-memory RecentMessageIndex.
+
+The history scan is simulated with fake channels whose history() call sleeps for
+a configurable REST round trip.
+
+Usage: python -m benchmarks.duplicate_index [channels] [rest_latency_ms]
+"""
+
+import asyncio
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from bot.duplicates import RecentMessageIndex
+
+
+@dataclass
+class FakeMessage:
+    id: int
+    author: int
+    channel_id: int
+    content: str
+    created_at: datetime
+    embeds: list = field(default_factory=list)
+    attachments: list = field(default_factory=list)
+
+
+class FakeChannel:
+    def __init__(self, channel_id, latency):
+        self.id = channel_id
+        self.latency = latency
+        self.messages = []
+
+    async def history(self, limit):
+        await asyncio.sleep(self.latency)
+        for message in self.messages[-limit:][::-1]:
+            yield message
+
+
+def make_stream(count, channels, users=200):
+    now = datetime.now(timezone.utc)
+    contents = [f"message number {i}" for i in range(count // 4)]
+    for i in range(count):
+        yield FakeMessage(
+            id=i,
+            author=random.randrange(users),
+            channel_id=random.randrange(channels),
+            content=random.choice(contents),
+            created_at=now + timedelta(milliseconds=i),
+        )
+
+
+async def history_scan(message, channels):
+    for channel in channels:
+        if channel.id == message.channel_id:
+            continue
+        async for msg in channel.history(limit=5):
+            if msg.embeds or message.attachments or not message.content.strip():
+                continue
+            if msg.author == message.author and msg.content == message.content:
+                if message.created_at - msg.created_at < timedelta(minutes=5):
+                    return True
+    return False
+
+
+async def bench_history(messages, channel_count, latency):
+    channels = [FakeChannel(i, latency) for i in range(channel_count)]
+    start = time.perf_counter()
+    for message in messages:
+        await history_scan(message, channels)
+        channels[message.channel_id].messages.append(message)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def bench_index(messages):
+    index = RecentMessageIndex()
+    start = time.perf_counter()
+    for message in messages:
+        index.add(
+            message.id,
+            message.author,
+            message.channel_id,
+            message.content,
+            message.created_at,
+        )
+        index.find_duplicate(
+            message.author, message.channel_id, message.content, message.created_at
+        )
+    return len(messages) / (time.perf_counter() - start)
+
+
+def main():
+    channel_count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+
+    # The scan is so slow that a handful of messages is enough
+    scan_messages = list(make_stream(20, channel_count))
+    index_messages = list(make_stream(200_000, channel_count))
+
+    before = asyncio.run(bench_history(scan_messages, channel_count, latency))
+    after = bench_index(index_messages)
+
+    print(f"channels={channel_count} rest_latency={latency * 1000:.0f}ms")
+    print(f"history scan: {before:>12,.1f} messages/sec")
+    print(f"index:        {after:>12,.1f} messages/sec")
+    print(f"speedup:      {after / before:>12,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
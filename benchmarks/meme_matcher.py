@@ -0,0 +1,89 @@
+"""
+Compares the linear regex scan /meme used to do with MemePatternMatcher at
+several pattern table sizes.
+
+Usage: python -m benchmarks.meme_matcher [sizes...]
+"""
+
+import random
+import sys
+import time
+
+from database.patterns import MemePatternMatcher, make_meme_pattern
+
+_rng = random.Random(42)
+WORDS = [
+    "".join(_rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(7))
+    for _ in range(20_000)
+]
+TEMPLATES = [
+    r"\b{0}\b",
+    r"{0}s?",
+    r"(?:{0}|{1})",
+    r"{0}.*{1}",
+    r"i (?:love|hate) {0}",
+    r"{0}\d+",
+]
+
+
+def make_patterns(count, rng):
+    patterns = []
+    for i in range(count):
+        template = rng.choice(TEMPLATES)
+        regex = template.format(rng.choice(WORDS), rng.choice(WORDS))
+        patterns.append(make_meme_pattern(i, regex, f"response {i}"))
+    # A few patterns without any usable literal always have to be confirmed
+    for i in range(count, count + 5):
+        regex = rf"^\d{{{i % 7 + 3}}}$"
+        patterns.append(make_meme_pattern(i, regex, f"response {i}"))
+    return tuple(patterns)
+
+
+def make_inputs(patterns, rng, count=2_000):
+    inputs = []
+    for _ in range(count):
+        words = rng.choices(WORDS, k=rng.randint(1, 8))
+        inputs.append(" ".join(words))
+    return inputs
+
+
+def linear_scan(patterns, text):
+    for pattern in patterns:
+        if pattern.compiled.search(text):
+            return pattern
+    return None
+
+
+def bench(func, inputs):
+    start = time.perf_counter()
+    for text in inputs:
+        func(text)
+    return (time.perf_counter() - start) / len(inputs)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 1_000, 10_000]
+    rng = random.Random(0)
+
+    print(f"{'patterns':>9} {'build':>10} {'linear scan':>14} {'matcher':>12}")
+    for size in sizes:
+        patterns = make_patterns(size, rng)
+        inputs = make_inputs(patterns, rng)
+
+        start = time.perf_counter()
+        matcher = MemePatternMatcher(patterns)
+        build = time.perf_counter() - start
+
+        for text in inputs:
+            assert matcher.match(text) is linear_scan(patterns, text)
+
+        linear = bench(lambda text: linear_scan(patterns, text), inputs)
+        combined = bench(matcher.match, inputs)
+        print(
+            f"{size:>9,} {build * 1000:>8.1f}ms {linear * 1e6:>12.1f}us"
+            f" {combined * 1e6:>10.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Reports the memory used by MessageStore snapshots, measured with tracemalloc,
+next to the store's own estimate that its budget is enforced against.
+
+Messages are synthetic, with chat-like lengths, a few hundred authors, and
+occasional replies and mentions.
+
+Usage: python -m benchmarks.message_store [messages]
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+
+import discord
+
+from bot.message_cache import MessageStore
+
+WORDS = ["iw4x", "mw2", "server", "lag", "when", "update", "aimbot", "gg", "lol"]
+
+
+@dataclass
+class FakeUser:
+    id: int
+    name: str
+
+
+@dataclass
+class FakeChannel:
+    id: int
+
+
+@dataclass
+class FakeReference:
+    message_id: int
+    resolved: object = None
+
+
+@dataclass
+class FakeMessage:
+    id: int
+    channel: FakeChannel
+    author: FakeUser
+    content: str
+    reference: FakeReference | None = None
+    mentions: list = field(default_factory=list)
+    embeds: list = field(default_factory=list)
+
+
+def make_messages(count):
+    rng = random.Random(42)
+    users = [FakeUser(1000 + i, f"user{i}") for i in range(300)]
+    channels = [FakeChannel(2000 + i) for i in range(20)]
+    first_id = discord.utils.time_snowflake(discord.utils.utcnow())
+
+    for i in range(count):
+        message_id = first_id + i
+        reference = None
+        if i and rng.random() < 0.2:
+            reference = FakeReference(message_id - rng.randint(1, min(i, 50)))
+        yield FakeMessage(
+            id=message_id,
+            channel=rng.choice(channels),
+            author=rng.choice(users),
+            content=" ".join(rng.choices(WORDS, k=rng.randint(1, 40))),
+            reference=reference,
+            mentions=rng.sample(users, 1) if rng.random() < 0.05 else [],
+        )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    # Large enough that nothing is evicted
+    store = MessageStore(budget=1 << 40)
+    messages = list(make_messages(count))
+    start = time.perf_counter()
+    for message in messages:
+        store.add(message)
+    elapsed = time.perf_counter() - start
+    del messages, store
+
+    # Messages are generated one at a time, so only what the store keeps is
+    # still allocated at the end
+    store = MessageStore(budget=1 << 40)
+    tracemalloc.start()
+    for message in make_messages(count):
+        store.add(message)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    per_100k = 100_000 / count
+    print(f"{count} messages stored in {elapsed * 1000:.0f} ms")
+    print(f"measured  {used / 1024 / 1024 * per_100k:>8.1f} MiB per 100k messages")
+    print(
+        f"estimated {store.size / 1024 / 1024 * per_100k:>8.1f} MiB per 100k messages"
+    )
+    print(f"measured  {used / count:>8.0f} bytes per message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Compares per-write latency of a deleted-message insert using a new MongoClient
+per write (the old behaviour) with the shared, pooled client.
+
+Needs a reachable MongoDB, MONGO_URI or mongodb://localhost:27017 by default.
+Documents are written to a throwaway collection that is dropped afterwards.
+
+Usage: python -m benchmarks.mongo_client [writes]
+"""
+
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+from pymongo import MongoClient
+
+from bot.mongodb.load_db import (
+    DeletedMessage,
+    close_mongodb_client,
+    get_mongodb_client,
+    get_mongodb_uri,
+)
+
+DATABASE = "discord_bot_benchmark"
+COLLECTION = "deleted_messages"
+
+
+def make_message(i):
+    return DeletedMessage(
+        message_id=i,
+        channel_id=1,
+        author_id=2,
+        author_name="bench",
+        content=f"deleted message {i}",
+        timestamp=datetime.now(timezone.utc),
+    )
+
+
+def client_per_write(uri, writes):
+    latencies = []
+    for i in range(writes):
+        start = time.perf_counter()
+        with MongoClient(uri) as client:
+            client[DATABASE][COLLECTION].insert_one(make_message(i).to_dict())
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def shared_client(writes):
+    latencies = []
+    for i in range(writes):
+        start = time.perf_counter()
+        client = get_mongodb_client()
+        client[DATABASE][COLLECTION].insert_one(make_message(i).to_dict())
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{name:<18} mean {statistics.mean(latencies) * 1000:>8.2f} ms"
+        f"   median {statistics.median(latencies) * 1000:>8.2f} ms"
+        f"   p99 {p99 * 1000:>8.2f} ms"
+    )
+
+
+def main():
+    writes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    uri = get_mongodb_uri()
+
+    client = get_mongodb_client()
+    try:
+        client.admin.command("ping")
+    except Exception as e:
+        print(f"MongoDB is not reachable: {e}")
+        return
+
+    try:
+        report("client per write", client_per_write(uri, writes))
+        report("shared client", shared_client(writes))
+    finally:
+        client.drop_database(DATABASE)
+        close_mongodb_client()
+
+
+if __name__ == "__main__":
+    main()
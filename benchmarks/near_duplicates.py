@@ -0,0 +1,155 @@
+"""
+Runs NearDuplicateIndex over a synthetic stream of chat messages on a simulated
+clock, with spam campaigns mixed in: one account posting the same text with a
+few characters changed in several channels, or several accounts posting it
+within seconds of each other.
+
+Prints the per-message latency of indexing and both lookups, how many spam
+copies were caught, how many ordinary messages were flagged, and the size of
+the index. Memory is traced in a second, shorter run.
+
+Usage: python -m benchmarks.near_duplicates [messages]
+"""
+
+import random
+import string
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from bot.duplicates import BURST_AUTHORS, NearDuplicateIndex
+from bot.metrics import Histogram
+
+# Upper bounds in microseconds
+LATENCY_BUCKETS_US = (25, 50, 75, 100, 150, 200, 300, 500, 1000, 5000)
+
+MESSAGE_INTERVAL = timedelta(milliseconds=20)
+CHANNELS = 40
+USERS = 5000
+CAMPAIGN_EVERY = 1000
+
+SPAM_TEMPLATES = [
+    "Free Discord Nitro for everyone, claim it here before it expires {url}",
+    "@everyone steam is giving away 50$ gift cards, get yours now {url}",
+    "hey i made a new mod menu for mw2, undetected and free download {url}",
+    "Join my server for free skins and giveaways every day {url}",
+]
+
+
+def make_vocabulary(rng, size=2000):
+    return [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9)))
+        for _ in range(size)
+    ]
+
+
+def mutate(rng, text, changes):
+    chars = list(text)
+    for _ in range(changes):
+        chars[rng.randrange(len(chars))] = rng.choice(string.ascii_letters + " .!")
+    return "".join(chars)
+
+
+def spam_text(rng, template):
+    url = "https://dlscord-gift.com/" + "".join(rng.choices(string.ascii_letters, k=8))
+    return mutate(rng, template.format(url=url), rng.randint(0, 3))
+
+
+def make_stream(rng, count):
+    """
+    Yields (author_id, channel_id, content, is_spam, detectable) tuples, where
+    detectable tells whether enough copies of the spam were sent before it.
+    """
+    vocabulary = make_vocabulary(rng)
+    pending = []
+    spammer = USERS
+    for i in range(count):
+        if i % CAMPAIGN_EVERY == 0:
+            template = rng.choice(SPAM_TEMPLATES)
+            if rng.random() < 0.5:
+                # One account, several channels
+                spammer += 1
+                pending.extend(
+                    (spammer, channel, spam_text(rng, template), copy > 0)
+                    for copy, channel in enumerate(rng.sample(range(CHANNELS), 3))
+                )
+            else:
+                # Several accounts at once
+                for copy in range(6):
+                    spammer += 1
+                    pending.append(
+                        (
+                            spammer,
+                            rng.randrange(CHANNELS),
+                            spam_text(rng, template),
+                            copy >= BURST_AUTHORS - 1,
+                        )
+                    )
+
+        if pending and rng.random() < 0.2:
+            author_id, channel_id, content, detectable = pending.pop(0)
+            yield author_id, channel_id, content, True, detectable
+        else:
+            words = " ".join(rng.choices(vocabulary, k=rng.randint(2, 25)))
+            yield rng.randrange(USERS), rng.randrange(CHANNELS), words, False, False
+
+
+def run(count, traced):
+    rng = random.Random(42)
+    index = NearDuplicateIndex()
+    latency = Histogram(LATENCY_BUCKETS_US)
+    started = datetime.now(timezone.utc)
+    spam = 0
+    detectable_spam = 0
+    spam_flagged = 0
+    false_positives = 0
+
+    stream = make_stream(rng, count)
+    for i, (author_id, channel_id, content, is_spam, detectable) in enumerate(stream):
+        now = started + i * MESSAGE_INTERVAL
+
+        start = time.perf_counter()
+        entry = index.add(i, author_id, channel_id, content, now)
+        flagged = entry is not None and bool(
+            index.find_near_duplicate(entry, now) or index.find_burst(entry, now)
+        )
+        latency.observe((time.perf_counter() - start) * 1e6)
+
+        if is_spam:
+            spam += 1
+            if detectable:
+                detectable_spam += 1
+                spam_flagged += flagged
+        elif flagged:
+            false_positives += 1
+
+        if traced and (i + 1) % (count // 5) == 0:
+            used = tracemalloc.get_traced_memory()[0]
+            print(
+                f"{i + 1:>9} messages  {len(index):>6} indexed"
+                f"  {used / 1024 / 1024:>6.1f} MiB"
+            )
+
+    return latency, spam, detectable_spam, spam_flagged, false_positives, len(index)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    latency, spam, detectable, flagged, false_positives, indexed = run(count, False)
+    print(f"{count} messages, {spam} spam copies, {detectable} of them detectable")
+    print(f"latency (us): {latency.summary()}")
+    print(
+        f"spam flagged: {flagged}/{detectable} ({flagged / detectable:.1%}),"
+        f" ordinary messages flagged: {false_positives}"
+    )
+    print(f"{indexed} messages indexed at the end")
+
+    tracemalloc.start()
+    run(min(count, 100_000), True)
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
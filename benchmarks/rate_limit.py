@@ -0,0 +1,64 @@
+"""
+Load test of SlidingWindowLimiter: thousands of users active at once while new
+users keep arriving and old ones go idle, on a simulated clock.
+
+Prints throughput, the number of tracked users and traced memory as the run
+progresses. Memory should level off once idle users start being evicted.
+
+Usage: python -m benchmarks.rate_limit [active_users] [events]
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+
+from bot.rate_limit import SlidingWindowLimiter
+
+
+def run(active_users, events, report):
+    rng = random.Random(42)
+    limiter = SlidingWindowLimiter(limit=10, window=10)
+    # 2000 events per simulated second, every user only stays for a while
+    step = 1 / 2000
+    over_limit = 0
+
+    start = time.perf_counter()
+    for i in range(events):
+        now = i * step
+        # Shift the active population by one user every 50 events
+        first_user = i // 50
+        user = first_user + rng.randrange(active_users)
+        # A few users spam
+        weight = 5 if user % 100 == 0 else 1
+        if limiter.hit(user, weight, now=now):
+            over_limit += 1
+
+        if report and (i + 1) % (events // 5) == 0:
+            used = tracemalloc.get_traced_memory()[0]
+            print(
+                f"{i + 1:>9} events  {len(limiter):>6} users tracked"
+                f"  {first_user + active_users:>7} users seen"
+                f"  {used / 1024 / 1024:>6.1f} MiB"
+            )
+
+    return time.perf_counter() - start, over_limit
+
+
+def main():
+    active_users = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    events = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000_000
+
+    elapsed, over_limit = run(active_users, events, report=False)
+    print(
+        f"{events / elapsed:.0f} events/s, {elapsed / events * 1e6:.2f} us per event,"
+        f" {over_limit} events over the limit"
+    )
+
+    tracemalloc.start()
+    run(active_users, events, report=True)
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Compares opening a fresh SQLite connection per query on the event loop with the
+long-lived, thread-offloaded connection from database.connection under
+concurrent command load.
+
+Besides throughput it reports the worst event loop stall, which is what delays
+gateway heartbeats and every other handler.
+
+Usage: python -m benchmarks.sqlite_access [concurrent_commands] [rows]
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from database.connection import Database
+
+
+def populate(path, rows):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE black_list (user_id INTEGER PRIMARY KEY, date_assigned TEXT, reason TEXT);
+        CREATE TABLE aka_list (id INTEGER PRIMARY KEY AUTOINCREMENT, aka TEXT NOT NULL, response TEXT NOT NULL);
+        """)
+    conn.executemany(
+        "INSERT INTO black_list (user_id, reason) VALUES (?, 'bench')",
+        ((i * 7,) for i in range(rows)),
+    )
+    conn.executemany(
+        "INSERT INTO aka_list (aka, response) VALUES (?, ?)",
+        ((f"aka{i}", f"response {i}") for i in range(rows)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def command_fresh_connection(path, n):
+    conn = sqlite3.connect(path)
+    conn.execute("SELECT 1 FROM black_list WHERE user_id = ?", (n,)).fetchone()
+    conn.close()
+
+    conn = sqlite3.connect(path)
+    row = conn.execute(
+        "SELECT response FROM aka_list WHERE LOWER(aka) = LOWER(?) LIMIT 1",
+        (f"AKA{n}",),
+    ).fetchone()
+    conn.close()
+    return row
+
+
+def query_blacklist(db, n):
+    with db.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM black_list WHERE user_id = ?", (n,))
+        return cursor.fetchone()
+
+
+def query_aka(db, n):
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT response FROM aka_list WHERE LOWER(aka) = LOWER(?) LIMIT 1",
+            (f"AKA{n}",),
+        )
+        return cursor.fetchone()
+
+
+async def watch_loop_lag(stop, result):
+    interval = 0.001
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        result.append(time.perf_counter() - start - interval)
+
+
+async def run_load(command, concurrency):
+    stop = asyncio.Event()
+    lag = []
+    watcher = asyncio.create_task(watch_loop_lag(stop, lag))
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(command(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await watcher
+    return concurrency / elapsed, max(lag, default=0.0)
+
+
+async def bench(path, concurrency):
+    async def fresh(n):
+        command_fresh_connection(path, n)
+
+    db = Database(path)
+
+    async def offloaded(n):
+        await db.run(query_blacklist, db, n)
+        await db.run(query_aka, db, n)
+
+    results = {
+        "connection per query": await run_load(fresh, concurrency),
+        "persistent + worker": await run_load(offloaded, concurrency),
+    }
+    db.close()
+    return results
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        populate(path, rows)
+        results = asyncio.run(bench(path, concurrency))
+
+    print(f"concurrent commands={concurrency} rows={rows}")
+    for name, (throughput, lag) in results.items():
+        print(
+            f"{name:<22} {throughput:>10,.0f} commands/sec"
+            f"   worst loop stall {lag * 1000:>8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
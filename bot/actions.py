@@ -0,0 +1,139 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+import discord
+
+from bot.log import logger
+from bot.metrics import Histogram
+from bot.utils import timeout_member
+
+ACTION_MAX_ATTEMPTS = 3
+ACTION_RETRY_DELAY = 0.5  # seconds, doubled after every attempt
+
+# Upper bounds in milliseconds, from message creation to its removal
+REMOVAL_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+@dataclass(slots=True)
+class Action:
+    name: str
+    # Returns a new coroutine every time, so the action can be retried. The
+    # action failed if the coroutine raises or returns False.
+    factory: object
+
+
+def timeout_action(member: discord.Member, duration: timedelta, reason: str):
+    return Action(
+        "timeout",
+        lambda: timeout_member(member, duration, reason, raise_rate_limited=True),
+    )
+
+
+class ModerationExecutor:
+    """
+    Carries out the side effects of a moderation decision.
+
+    The offending message is deleted first and every other action is started
+    right after it, without waiting for the deletion, as they do not depend on
+    each other. Actions that are rate limited are retried with backoff.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = ACTION_MAX_ATTEMPTS,
+        retry_delay: float = ACTION_RETRY_DELAY,
+    ):
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+        self.removal_latency = Histogram(REMOVAL_BUCKETS_MS)
+        self.failed_actions = 0
+        self.retries = 0
+
+    async def _attempt(self, action: Action):
+        delay = self.retry_delay
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return await action.factory()
+            except discord.RateLimited as e:
+                # discord.py would have had to wait longer than it is allowed to
+                if attempt == self.max_attempts:
+                    raise
+                wait = e.retry_after
+            except discord.HTTPException as e:
+                if e.status != 429 or attempt == self.max_attempts:
+                    raise
+                wait = delay
+
+            self.retries += 1
+            logger.warning(
+                "Moderation action %s was rate limited, retrying in %.1fs",
+                action.name,
+                wait,
+            )
+            await asyncio.sleep(wait)
+            delay *= 2
+
+    async def _delete(self, message: discord.Message):
+        try:
+            await self._attempt(Action("delete", message.delete))
+        except discord.NotFound:
+            # Someone else removed it already
+            pass
+        self.removal_latency.observe(
+            (discord.utils.utcnow() - message.created_at).total_seconds() * 1000
+        )
+
+    async def execute(
+        self,
+        message: discord.Message | None = None,
+        delete: bool = False,
+        actions: list[Action] = (),
+    ) -> int:
+        """
+        Deletes message if asked to and runs actions, all concurrently.
+
+        Returns:
+            int: The number of actions that succeeded, deletion included
+        """
+        names = []
+        tasks = []
+        if delete:
+            names.append("delete")
+            tasks.append(asyncio.create_task(self._delete(message)))
+        for action in actions:
+            names.append(action.name)
+            tasks.append(asyncio.create_task(self._attempt(action)))
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        succeeded = 0
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                self.failed_actions += 1
+                logger.error("Moderation action %s failed: %s", name, result)
+            elif result is False:
+                # The action logged why already
+                self.failed_actions += 1
+            else:
+                succeeded += 1
+
+        logger.debug(
+            "Ran moderation actions %s in %.1f ms",
+            ", ".join(names),
+            (time.perf_counter() - start) * 1000,
+        )
+        return succeeded
+
+    def log_stats(self):
+        logger.info(
+            "Moderation: time to removal (ms) %s, %d retries, %d failed actions",
+            self.removal_latency.summary(),
+            self.retries,
+            self.failed_actions,
+        )
+
+
+moderation = ModerationExecutor()
@@ -1,17 +1,21 @@
-import re
+from datetime import timezone
 from typing import Literal
 
 import discord
 from discord import app_commands
 
 from bot.log import logger
+from bot.mongodb import DELETED_PAGE_SIZE, find_deleted_messages_async
+from bot.utils import safe_truncate
 from database import (
-    get_meme_patterns,
     add_aka_response,
-    search_aka,
+    complete_aka,
+    search_aka_fuzzy_async,
     add_meme_pattern,
     add_user_to_blacklist,
     is_user_blacklisted,
+    is_valid_meme_pattern,
+    match_meme_pattern_async,
 )
 
 GUILD_ID = 1110531063161299074
@@ -19,6 +23,63 @@ GUILD_ID = 1110531063161299074
 BOT_LOG = 1112049391482703873
 GENERAL_CHANNEL = 1110531063744303138
 
+# Keeps a full page of deleted messages within the 6000 character embed limit
+DELETED_CONTENT_PREVIEW = 400
+
+
+def deleted_messages_embed(messages: list[dict], page: int) -> discord.Embed:
+    embed = discord.Embed(
+        title="Deleted Messages",
+        description=f"Page {page}, newest first.",
+        color=0xDD2E44,
+    )
+    for message in messages:
+        # MongoDB returns naive datetimes in UTC
+        deleted_at = message["deleted_at"].replace(tzinfo=timezone.utc)
+        embed.add_field(
+            name=f"{message['author_name']} ({message['author_id']})",
+            value=(
+                f"<#{message['channel_id']}> <t:{int(deleted_at.timestamp())}:f>\n"
+                f"{safe_truncate(message['content'], DELETED_CONTENT_PREVIEW)}"
+            ),
+            inline=False,
+        )
+    embed.set_footer(text=f"Last message ID: {messages[-1]['message_id']}")
+    return embed
+
+
+class DeletedMessagesView(discord.ui.View):
+    """Pages through deleted messages, keyed on the last message shown."""
+
+    def __init__(self, filters: dict, messages: list[dict]):
+        super().__init__(timeout=300)
+        self.filters = filters
+        self.page = 1
+        self._update(messages)
+
+    def _update(self, messages: list[dict]):
+        # One extra message is fetched to tell whether another page exists
+        self.messages = messages[:DELETED_PAGE_SIZE]
+        self.older.disabled = len(messages) <= DELETED_PAGE_SIZE
+        last = self.messages[-1]
+        self.before = (last["deleted_at"], last["message_id"])
+
+    @discord.ui.button(label="Older", style=discord.ButtonStyle.secondary)
+    async def older(self, interaction: discord.Interaction, button: discord.ui.Button):
+        messages = await find_deleted_messages_async(
+            **self.filters, before=self.before, limit=DELETED_PAGE_SIZE + 1
+        )
+        if not messages:
+            button.disabled = True
+            await interaction.response.edit_message(view=self)
+            return
+
+        self.page += 1
+        self._update(messages)
+        await interaction.response.edit_message(
+            embed=deleted_messages_embed(self.messages, self.page), view=self
+        )
+
 
 async def setup(bot):
     async def on_tree_error(
@@ -62,6 +123,12 @@ async def setup(bot):
         interaction: discord.Interaction, regex: str, response: str
     ):
         """Slash command to add a new message pattern to the database."""
+        if not is_valid_meme_pattern(regex):
+            await interaction.response.send_message(
+                f"Invalid regex: `{regex}`", ephemeral=True
+            )
+            return
+
         add_meme_pattern(regex, response)
         logger.info("Saved a new meme pattern: %s", regex)
         await interaction.response.send_message(
@@ -99,16 +166,31 @@ async def setup(bot):
             )
             return
 
-        # Search the database for a match
-        response = search_aka(input)
+        # Search the database for a match, and similar AKAs in case there is none
+        response, suggestions = await search_aka_fuzzy_async(input)
 
         if response:
             await interaction.response.send_message(response, ephemeral=False)
+        elif suggestions:
+            names = ", ".join(f"`{aka}`" for aka in suggestions)
+            await interaction.response.send_message(
+                f"No matching aka patterns found. Did you mean: {names}?",
+                ephemeral=True,
+            )
         else:
             await interaction.response.send_message(
                 "No matching aka patterns found.", ephemeral=True
             )
 
+    @aka.autocomplete("input")
+    async def aka_autocomplete(interaction: discord.Interaction, current: str):
+        # Discord rejects choices longer than 100 characters
+        return [
+            app_commands.Choice(name=name, value=name)
+            for name in complete_aka(current)
+            if len(name) <= 100
+        ]
+
     @bot.tree.command(
         name="meme",
         description="Check if the input matches any predefined memes.",
@@ -125,22 +207,59 @@ async def setup(bot):
             )
             return
 
-        message_patterns = get_meme_patterns()
         # Check if any of the patterns match the input
-        for pattern in message_patterns:
-            if re.search(pattern["regex"], input, re.IGNORECASE):
-                response = pattern["response"]
-                reply_message = await interaction.response.send_message(
-                    response, ephemeral=False
-                )
-                # Add a reaction to the reply message (if the user decides to delete it)
-                await reply_message.add_reaction("\U0000274c")
-                break
+        response = await match_meme_pattern_async(input)
+        if response:
+            reply_message = await interaction.response.send_message(
+                response, ephemeral=False
+            )
+            # Add a reaction to the reply message (if the user decides to delete it)
+            await reply_message.add_reaction("\U0000274c")
         else:
             await interaction.response.send_message(
                 "No matching patterns found.", ephemeral=True
             )
 
+    @bot.tree.command(
+        name="deleted",
+        description="Look up deleted messages by user, channel or content.",
+        guild=discord.Object(id=GUILD_ID),
+    )
+    @app_commands.checks.has_permissions(manage_messages=True)
+    async def deleted(
+        interaction: discord.Interaction,
+        user: discord.User | None = None,
+        channel: discord.abc.GuildChannel | None = None,
+        search: str | None = None,
+    ):
+        """Slash command to page through stored deleted messages."""
+        if user is None and channel is None and not search:
+            await interaction.response.send_message(
+                "Pick a user, a channel or search text.", ephemeral=True
+            )
+            return
+
+        filters = {
+            "author_id": user.id if user else None,
+            "channel_id": channel.id if channel else None,
+            "text": search,
+        }
+        messages = await find_deleted_messages_async(
+            **filters, limit=DELETED_PAGE_SIZE + 1
+        )
+        if not messages:
+            await interaction.response.send_message(
+                "No deleted messages found.", ephemeral=True
+            )
+            return
+
+        view = DeletedMessagesView(filters, messages)
+        await interaction.response.send_message(
+            embed=deleted_messages_embed(view.messages, view.page),
+            view=view,
+            ephemeral=True,
+        )
+
     await bot.tree.sync(guild=discord.Object(id=GUILD_ID))  # Force sync
 
     logger.info("Commands extension loaded!")
@@ -0,0 +1,376 @@
+import hashlib
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+DUPLICATE_WINDOW = timedelta(minutes=5)
+MAX_TRACKED_MESSAGES = 50_000
+
+
+def normalize_content(content: str) -> str:
+    """Collapse whitespace and case so trivial edits still count as duplicates."""
+    return " ".join(content.split()).casefold()
+
+
+@dataclass(slots=True)
+class RecentMessage:
+    message_id: int
+    channel_id: int
+    created_at: datetime
+    has_embeds: bool
+
+
+class RecentMessageIndex:
+    """
+    Bounded, time-windowed index of recent messages keyed by
+    (author_id, blake2b digest of the normalized content). Unlike hash(), the
+    digest does not make different texts equal in practice.
+
+    Entries are kept in insertion order so expiry only ever has to look at the
+    front of the index. Every operation is O(1) amortized and touches no REST
+    endpoint.
+    """
+
+    def __init__(
+        self,
+        window: timedelta = DUPLICATE_WINDOW,
+        max_entries: int = MAX_TRACKED_MESSAGES,
+    ):
+        self.window = window
+        self.max_entries = max_entries
+        # (author_id, content_digest) -> {channel_id: RecentMessage}
+        self._entries: OrderedDict[tuple[int, bytes], dict[int, RecentMessage]] = (
+            OrderedDict()
+        )
+        # message_id -> key, used to forget deleted messages and embed updates
+        self._keys_by_message: dict[int, tuple[int, bytes]] = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _key(author_id: int, content: str) -> tuple[int, bytes]:
+        digest = hashlib.blake2b(
+            normalize_content(content).encode(), digest_size=16
+        ).digest()
+        return author_id, digest
+
+    def _expire(self, now: datetime):
+        cutoff = now - self.window
+        while self._entries:
+            key, by_channel = next(iter(self._entries.items()))
+            newest = max(entry.created_at for entry in by_channel.values())
+            if newest >= cutoff and self._size <= self.max_entries:
+                break
+            del self._entries[key]
+            for entry in by_channel.values():
+                self._keys_by_message.pop(entry.message_id, None)
+            self._size -= len(by_channel)
+
+    def find_duplicate(
+        self, author_id: int, channel_id: int, content: str, now: datetime
+    ) -> RecentMessage | None:
+        """
+        Returns a message with the same content sent by the same author in
+        another channel within the window, ignoring messages that have embeds.
+        """
+        by_channel = self._entries.get(self._key(author_id, content))
+        if not by_channel:
+            return None
+
+        for entry in by_channel.values():
+            if entry.channel_id == channel_id or entry.has_embeds:
+                continue
+            if now - entry.created_at < self.window:
+                return entry
+
+        return None
+
+    def add(
+        self,
+        message_id: int,
+        author_id: int,
+        channel_id: int,
+        content: str,
+        created_at: datetime,
+        has_embeds: bool = False,
+    ):
+        key = self._key(author_id, content)
+        by_channel = self._entries.get(key)
+        if by_channel is None:
+            by_channel = self._entries[key] = {}
+        else:
+            self._entries.move_to_end(key)
+
+        previous = by_channel.get(channel_id)
+        if previous is not None:
+            self._keys_by_message.pop(previous.message_id, None)
+        else:
+            self._size += 1
+
+        by_channel[channel_id] = RecentMessage(
+            message_id, channel_id, created_at, has_embeds
+        )
+        self._keys_by_message[message_id] = key
+        self._expire(created_at)
+
+    def mark_embeds(self, message_id: int):
+        """Flags a tracked message whose embeds arrived after it was sent."""
+        key = self._keys_by_message.get(message_id)
+        if key is None:
+            return
+
+        for entry in self._entries[key].values():
+            if entry.message_id == message_id:
+                entry.has_embeds = True
+
+    def discard(self, message_id: int):
+        """Forgets a message, e.g. because it was deleted."""
+        key = self._keys_by_message.pop(message_id, None)
+        if key is None:
+            return
+
+        by_channel = self._entries[key]
+        for channel_id, entry in list(by_channel.items()):
+            if entry.message_id == message_id:
+                del by_channel[channel_id]
+                self._size -= 1
+        if not by_channel:
+            del self._entries[key]
+
+
+# Near-duplicates: MinHash signatures over character shingles, computed with
+# one-permutation hashing. Every shingle hash lands in one of SIGNATURE_BINS
+# bins that keep their minimum, and the low BIN_BITS of each bin are packed into
+# a single integer. Texts with a Jaccard similarity of J match in about J of the
+# bins. Signatures are split into bands of BAND_BINS bins for the LSH index, so
+# only messages sharing a whole band are compared.
+SHINGLE_SIZE = 4
+MIN_FINGERPRINT_LENGTH = 20
+SIGNATURE_BINS = 16
+BIN_BITS = 16
+BAND_BINS = 2
+MIN_SHARED_BINS = 7
+MAX_BUCKET_SIZE = 64
+
+# The same text from this many accounts within the window is a spam burst
+BURST_AUTHORS = 4
+BURST_WINDOW = timedelta(seconds=60)
+
+BIN_MASK = (1 << BIN_BITS) - 1
+LSH_BANDS = SIGNATURE_BINS // BAND_BINS
+BAND_BITS = BIN_BITS * BAND_BINS
+BAND_MASK = (1 << BAND_BITS) - 1
+_BIN_SHIFT = SIGNATURE_BINS.bit_length() - 1
+_EMPTY_BIN = 1 << 64
+_LOWEST_BIN_BITS = sum(1 << (index * BIN_BITS) for index in range(SIGNATURE_BINS))
+
+
+def minhash(content: str) -> int | None:
+    """
+    Returns the packed MinHash signature of the normalized content, or None if
+    it is too short to tell near-duplicates apart from common phrases.
+    """
+    text = normalize_content(content)
+    if len(text) < MIN_FINGERPRINT_LENGTH:
+        return None
+
+    bins = [_EMPTY_BIN] * SIGNATURE_BINS
+    last_bin = SIGNATURE_BINS - 1
+    shingles = {text[i : i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    for h in map(hash, shingles):
+        h &= 0xFFFFFFFFFFFFFFFF
+        index = h & last_bin
+        value = h >> _BIN_SHIFT
+        if value < bins[index]:
+            bins[index] = value
+
+    signature = 0
+    for index in range(SIGNATURE_BINS):
+        # Empty bins borrow from the next filled one, offset by the distance,
+        # the same way for every text
+        value = bins[index]
+        distance = 0
+        while value == _EMPTY_BIN:
+            distance += 1
+            value = bins[(index + distance) % SIGNATURE_BINS]
+        value += distance * 0x9E3779B9
+        signature |= (value & BIN_MASK) << (index * BIN_BITS)
+    return signature
+
+
+def shared_bins(a: int, b: int) -> int:
+    """Number of bins two signatures agree on."""
+    # Fold every bin that differs down to its lowest bit, then count those
+    diff = a ^ b
+    shift = BIN_BITS // 2
+    while shift:
+        diff |= diff >> shift
+        shift //= 2
+    return SIGNATURE_BINS - (diff & _LOWEST_BIN_BITS).bit_count()
+
+
+@dataclass(slots=True, eq=False)
+class FingerprintedMessage:
+    message_id: int
+    author_id: int
+    channel_id: int
+    created_at: datetime
+    signature: int
+    has_embeds: bool
+
+
+class NearDuplicateIndex:
+    """
+    Time-windowed LSH index of MinHash signatures, to find near-identical text
+    from one author across channels or from many authors at once.
+
+    Buckets keep their newest MAX_BUCKET_SIZE messages, so a flood of the same
+    text cannot make lookups slow, and the index holds at most max_entries.
+    """
+
+    def __init__(
+        self,
+        window: timedelta = DUPLICATE_WINDOW,
+        max_entries: int = MAX_TRACKED_MESSAGES,
+        min_shared_bins: int = MIN_SHARED_BINS,
+    ):
+        self.window = window
+        self.max_entries = max_entries
+        self.min_shared_bins = min_shared_bins
+
+        # One dict per band: band value -> messages in order of arrival
+        self._bands: list[dict[int, list[FingerprintedMessage]]] = [
+            {} for _ in range(LSH_BANDS)
+        ]
+        self._messages: dict[int, FingerprintedMessage] = {}
+        self._order: deque[FingerprintedMessage] = deque()
+
+    def __len__(self):
+        return len(self._messages)
+
+    @staticmethod
+    def _band_keys(signature: int):
+        for band in range(LSH_BANDS):
+            yield band, signature >> (band * BAND_BITS) & BAND_MASK
+
+    def get(self, message_id: int) -> FingerprintedMessage | None:
+        return self._messages.get(message_id)
+
+    def add(
+        self,
+        message_id: int,
+        author_id: int,
+        channel_id: int,
+        content: str,
+        created_at: datetime,
+        has_embeds: bool = False,
+    ) -> FingerprintedMessage | None:
+        signature = minhash(content)
+        if signature is None:
+            return None
+
+        entry = FingerprintedMessage(
+            message_id, author_id, channel_id, created_at, signature, has_embeds
+        )
+        self.discard(message_id)
+        self._messages[message_id] = entry
+        self._order.append(entry)
+        for band, key in self._band_keys(signature):
+            bucket = self._bands[band].setdefault(key, [])
+            bucket.append(entry)
+            if len(bucket) > MAX_BUCKET_SIZE:
+                del bucket[0]
+
+        self._expire(created_at)
+        return entry
+
+    def _expire(self, now: datetime):
+        cutoff = now - self.window
+        while self._order:
+            oldest = self._order[0]
+            if self._messages.get(oldest.message_id) is not oldest:
+                # Discarded or replaced already
+                self._order.popleft()
+                continue
+            if oldest.created_at >= cutoff and len(self._messages) <= self.max_entries:
+                break
+            self._order.popleft()
+            self._remove(oldest)
+
+    def _remove(self, entry: FingerprintedMessage):
+        del self._messages[entry.message_id]
+        for band, key in self._band_keys(entry.signature):
+            bucket = self._bands[band].get(key)
+            if bucket is None:
+                continue
+            try:
+                bucket.remove(entry)
+            except ValueError:
+                # Pushed out of a full bucket already
+                continue
+            if not bucket:
+                del self._bands[band][key]
+
+    def discard(self, message_id: int):
+        """Forgets a message, e.g. because it was deleted."""
+        entry = self._messages.get(message_id)
+        if entry is not None:
+            self._remove(entry)
+
+    def mark_embeds(self, message_id: int):
+        entry = self._messages.get(message_id)
+        if entry is not None:
+            entry.has_embeds = True
+
+    def similar(self, entry: FingerprintedMessage, since: datetime):
+        """Yields other messages created after since with a near-identical text."""
+        seen = {entry.message_id}
+        for band, key in self._band_keys(entry.signature):
+            bucket = self._bands[band].get(key)
+            if not bucket:
+                continue
+            for other in bucket:
+                if other.message_id in seen:
+                    continue
+                seen.add(other.message_id)
+                if other.created_at < since:
+                    continue
+                if (
+                    shared_bins(other.signature, entry.signature)
+                    >= self.min_shared_bins
+                ):
+                    yield other
+
+    def find_near_duplicate(
+        self, entry: FingerprintedMessage, now: datetime
+    ) -> FingerprintedMessage | None:
+        """
+        Returns a near-identical message by the same author in another channel
+        within the window, ignoring messages that have embeds.
+        """
+        for other in self.similar(entry, now - self.window):
+            if (
+                other.author_id == entry.author_id
+                and other.channel_id != entry.channel_id
+                and not other.has_embeds
+            ):
+                return other
+        return None
+
+    def find_burst(
+        self,
+        entry: FingerprintedMessage,
+        now: datetime,
+        min_authors: int = BURST_AUTHORS,
+        window: timedelta = BURST_WINDOW,
+    ) -> list[FingerprintedMessage]:
+        """
+        Returns the near-identical messages sent within window if, together with
+        entry, at least min_authors accounts sent them, otherwise nothing.
+        """
+        matches = list(self.similar(entry, now - window))
+        authors = {entry.author_id}
+        authors.update(other.author_id for other in matches)
+        return matches if len(authors) >= min_authors else []
@@ -1,17 +1,27 @@
+from bot.actions import moderation
 from bot.events_handlers import (
-    handle_bulk_message_delete,
     handle_member_join,
     handle_member_update,
     handle_message,
-    handle_message_delete,
-    handle_message_edit,
+    handle_raw_bulk_message_delete,
+    handle_raw_message_delete,
+    handle_raw_message_edit,
     handle_reaction_add,
     handle_voice_state_update,
+    message_rules,
 )
 from bot.log import logger
+from bot.log_dispatcher import log_dispatcher
+from bot.mongodb import (
+    ensure_deleted_message_indexes,
+    run_in_background,
+    run_mongodb,
+)
 
 
 async def setup(bot):
+    run_in_background(run_mongodb(ensure_deleted_message_indexes))
+
     @bot.event
     async def on_message(message):
         await handle_message(message, bot)
@@ -28,20 +38,28 @@ async def setup(bot):
     async def on_member_update(before, after):
         await handle_member_update(before, after)
 
+    # The raw events also fire for messages that fell out of the discord.py
+    # cache, handlers look them up in their own message store instead
     @bot.event
-    async def on_message_delete(message):
-        await handle_message_delete(message, bot)
+    async def on_raw_message_delete(payload):
+        await handle_raw_message_delete(payload, bot)
 
     @bot.event
-    async def on_bulk_message_delete(messages):
-        await handle_bulk_message_delete(messages, bot)
+    async def on_raw_bulk_message_delete(payload):
+        await handle_raw_bulk_message_delete(payload, bot)
 
     @bot.event
-    async def on_message_edit(before, after):
-        await handle_message_edit(before, after, bot)
+    async def on_raw_message_edit(payload):
+        await handle_raw_message_edit(payload, bot)
 
     @bot.event
     async def on_voice_state_update(member, before, after):
         await handle_voice_state_update(member, before, after, bot)
 
     logger.info("Events extension loaded!")
+
+
+async def teardown(bot):
+    message_rules.log_stats()
+    moderation.log_stats()
+    await log_dispatcher.close()
@@ -1,9 +1,10 @@
 from .member_events import handle_member_join, handle_member_update
 from .message_events import (
-    handle_bulk_message_delete,
     handle_message,
-    handle_message_delete,
-    handle_message_edit,
+    handle_raw_bulk_message_delete,
+    handle_raw_message_delete,
+    handle_raw_message_edit,
+    message_rules,
 )
 from .reaction_events import handle_reaction_add
 from .voice_events import handle_voice_state_update
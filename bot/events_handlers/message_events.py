@@ -1,14 +1,19 @@
-import time
 import re
+import time
 from datetime import timedelta
 
 import discord
 
+from bot.actions import Action, moderation, timeout_action
+from bot.duplicates import BURST_AUTHORS, NearDuplicateIndex, RecentMessageIndex
 from bot.log import logger
-from bot.utils import aware_utcnow, timeout_member, safe_truncate
+from bot.log_dispatcher import log_dispatcher
+from bot.rate_limit import SlidingWindowLimiter
+from bot.rules import RulePipeline
+from bot.message_cache import BotReplyIndex, MessageSnapshot, MessageStore
+from bot.utils import aware_utcnow, safe_truncate
 from database import add_user_to_role
-from bot.mongodb.load_db import DeletedMessage
-from bot.mongodb.load_db import write_deleted_message_to_collection
+from bot.mongodb import DeletedMessage, log_deleted_message
 
 BOT_LOG = 1112049391482703873
 GENERAL_CHANNEL = 1110531063744303138
@@ -33,6 +38,8 @@ ALLOWED_CHANNELS = [
     1145459504436220014,  # mw3-support
 ]
 
+TORRENT_EXTENSIONS = frozenset((".torrent", ".TORRENT"))
+
 # Discord embed limits
 MAX_TITLE = 256
 MAX_DESC = 4096
@@ -40,8 +47,54 @@ MAX_FIELD_NAME = 256
 MAX_FIELD_VALUE = 1024
 MAX_FOOTER = 2048
 
-# Cooldown: user_id -> [timestamps]
-MENTION_COOLDOWNS = {}
+# Spam across messages: at most this many per user within the window (seconds)
+MESSAGE_RATE_LIMIT = (10, 10)
+MENTION_RATE_LIMIT = (8, 60)
+LINK_RATE_LIMIT = (6, 60)
+RATE_LIMIT_TIMEOUT = timedelta(minutes=5)
+
+message_rate = SlidingWindowLimiter(*MESSAGE_RATE_LIMIT)
+mention_rate = SlidingWindowLimiter(*MENTION_RATE_LIMIT)
+link_rate = SlidingWindowLimiter(*LINK_RATE_LIMIT)
+
+# Messages sent in the last few minutes, used to detect cross-channel duplicates
+recent_messages = RecentMessageIndex()
+# The same messages by text similarity, to catch duplicates with small changes
+# and the same text sent by many accounts at once
+near_messages = NearDuplicateIndex()
+SPAM_BURST_TIMEOUT = timedelta(minutes=30)
+# A burst only gets its messages removed with more evidence than the shared
+# text: authors with new accounts, or the text spread over several channels.
+# Otherwise it is only logged, as people often share the same link.
+NEW_ACCOUNT_AGE = timedelta(days=7)
+NEW_MEMBER_AGE = timedelta(days=1)
+BURST_CHANNELS = 3
+# Links to these domains and their subdomains never make a spam burst
+SAFE_LINK_DOMAINS = frozenset(
+    (
+        "alterware.dev",
+        "github.com",
+        "youtube.com",
+        "youtu.be",
+        "discord.com",
+        "discordapp.com",
+        "discordapp.net",
+        "tenor.com",
+    )
+)
+LINK_DOMAIN_PATTERN = re.compile(r"https?://([^/\s:?#]+)", re.IGNORECASE)
+
+# Snapshots of recent messages, used to log edits and deletions of messages
+# that discord.py no longer caches
+message_store = MessageStore()
+
+# Checks applied to every guild message, registered at the end of this module
+message_rules = RulePipeline()
+
+# Replies of the bot, used to notice when someone deletes a message it replied to
+bot_replies = BotReplyIndex()
+# Messages checked for a bot reply when the reply index cannot answer
+REPLY_HISTORY_LIMIT = 50
 
 
 async def handle_at_everyone(message):
@@ -65,33 +118,43 @@ async def handle_at_everyone(message):
             logger.info(f"Spam role found: {spam_role}")
 
             if spam_role:
-                try:
-                    if spam_role not in message.author.roles:
-                        # Check if we can actually assign the role
+                actions = []
+                if spam_role not in message.author.roles:
+
+                    async def add_spam_role():
                         await message.author.add_roles(spam_role, reason="Spam mention")
 
-                        # Add the user to the database
+                        # Only reached once the role was added, add_roles
+                        # raises otherwise
                         add_user_to_role(
                             message.author.id, SPAM_ROLE_ID, message.author.name
                         )
                         logger.info("Role added successfully")
-                    else:
-                        logger.info("User already has the spam role")
 
-                    await message.reply(
-                        f"Dink Donk! Time to ping everyone! {spam_role.mention}",
-                        mention_author=True,
+                    actions.append(Action("add_spam_role", add_spam_role))
+                else:
+                    logger.info("User already has the spam role")
+
+                actions.append(
+                    Action(
+                        "reply",
+                        lambda: message.reply(
+                            f"Dink Donk! Time to ping everyone! {spam_role.mention}",
+                            mention_author=True,
+                        ),
                     )
-
-                    await timeout_member(
+                )
+                actions.append(
+                    timeout_action(
                         message.author, timedelta(minutes=5), "Spamming mentions"
                     )
-                    logger.info("User timed out")
-                    return True
-                except discord.Forbidden:
-                    logger.error("Bot lacks permissions to add role/timeout user")
-                except discord.HTTPException as e:
-                    logger.error(f"HTTP Error: {e}")
+                )
+
+                # The role, the reply and the timeout do not depend on each other.
+                # If all of them failed, e.g. for lack of permissions, later
+                # rules still get to look at the message.
+                succeeded = await moderation.execute(message, actions=actions)
+                return succeeded > 0
         else:
             logger.info("User has permission to mention everyone, ignoring")
 
@@ -150,62 +213,89 @@ async def handle_hate_me(message):
     return False
 
 
-async def is_message_a_duplicate(message):
-    guild = message.guild
-    for channel in guild.text_channels:
-        if channel.id == message.channel.id:
-            continue
-
-        try:
-            async for msg in channel.history(limit=5):
-                # Too many false positives
-                if msg.embeds:
-                    continue
-                # ^^
-                if message.attachments:
-                    continue
-                # ^^
-                if not message.content.strip():
-                    continue
-
-                if msg.author == message.author and msg.content == message.content:
-                    current_time = aware_utcnow()
-                    message_time = msg.created_at
-
-                    time_difference = current_time - message_time
-                    if time_difference >= timedelta(minutes=5):
-                        logger.debug(
-                            f"Message is probably not a duplicate. Time difference: {time_difference}"
-                        )
-                        continue
+def track_message(message):
+    """Feeds a message into the recent message indexes used for duplicate checks."""
+    if not message.content.strip():
+        return
 
-                    await message.channel.send(
-                        f"Hey {message.author.name}, you've already sent this message in {channel.mention}!"
-                    )
-                    member = message.guild.get_member(message.author.id)
-                    await timeout_member(member)
-                    return
-        except discord.Forbidden:
-            logger.error(
-                "Bot does not have permission to read messages in %s", channel.name
-            )
-        except discord.HTTPException as e:
-            logger.error("An error occurred: %s", e)
+    for index in (recent_messages, near_messages):
+        index.add(
+            message.id,
+            message.author.id,
+            message.channel.id,
+            message.content,
+            message.created_at,
+            bool(message.embeds),
+        )
+
+
+async def is_message_a_duplicate(message):
+    # Too many false positives
+    if message.attachments:
+        return False
+    # ^^
+    if not message.content.strip():
+        return False
+
+    now = aware_utcnow()
+    duplicate = recent_messages.find_duplicate(
+        message.author.id, message.channel.id, message.content, now
+    )
+    if duplicate is None:
+        # Not sent before as is, but maybe with a few characters changed
+        entry = near_messages.get(message.id)
+        if entry is not None:
+            duplicate = near_messages.find_near_duplicate(entry, now)
+    if duplicate is None:
+        return False
+
+    channel = message.guild.get_channel_or_thread(duplicate.channel_id)
+    if channel is None:
+        return False
+
+    member = message.guild.get_member(message.author.id)
+    await moderation.execute(
+        message,
+        actions=[
+            Action(
+                "reply",
+                lambda: message.channel.send(
+                    f"Hey {message.author.name}, you've already sent this message in {channel.mention}!"
+                ),
+            ),
+            timeout_action(member, timedelta(minutes=1), "Requested by the bot"),
+        ],
+    )
+    return True
 
 
-async def was_message_replied_by_bot(message, bot):
+async def was_message_replied_by_bot(message, channel, bot):
     """
     Checks if a deleted message was replied to by a later message from the bot.
 
     Args:
-        message (discord.Message): The deleted message.
+        message (MessageSnapshot): The deleted message.
+        channel (discord.abc.Messageable): The channel of the deleted message.
         bot (discord.Client): The bot instance.
 
     Returns:
-        discord.Message or None: The bot's reply message if it exists, otherwise None.
+        discord.Message, discord.PartialMessage or None: The bot's reply message if it exists, otherwise None.
     """
-    async for later_message in message.channel.history(after=message.created_at):
-        if later_message.reference and later_message.reference.message_id == message.id:
+    reply_id = bot_replies.get(message.message_id)
+    if reply_id is not None:
+        return channel.get_partial_message(reply_id)
+
+    if bot_replies.covers(message.created_at):
+        return None
+
+    # The message predates the reply index, only look at the messages right after it
+    async for later_message in channel.history(
+        after=message.created_at, limit=REPLY_HISTORY_LIMIT
+    ):
+        if (
+            later_message.reference
+            and later_message.reference.message_id == message.message_id
+        ):
             if later_message.author == bot.user:
                 return later_message
     return None
@@ -224,36 +314,47 @@ async def detect_ghost_ping(message, bot):
         description="A ghost ping was detected.",
         color=0xDD2E44,
     )
-    embed.add_field(name="Author", value=message.author.mention, inline=True)  # noqa
-    embed.add_field(name="Channel", value=message.channel.mention, inline=True)  # noqa
+    embed.add_field(name="Author", value=message.author_mention, inline=True)  # noqa
+    embed.add_field(name="Channel", value=message.channel_mention, inline=True)  # noqa
 
-    mentioned_users = ", ".join([user.name for user in message.mentions])
+    mentioned_users = ", ".join(message.mentions)
     embed.add_field(
         name="Mentions",
-        value=f"The message deleted by {message.author} mentioned: {mentioned_users}",  # noqa
+        value=f"The message deleted by {message.author_name} mentioned: {mentioned_users}",  # noqa
         inline=False,
     )  # noqa
 
-    embed.set_footer(text=f"Message ID: {message.id} | Author ID: {message.author.id}")
+    embed.set_footer(
+        text=f"Message ID: {message.message_id} | Author ID: {message.author_id}"
+    )
 
-    await channel.send(embed=embed)
+    log_dispatcher.post(channel, embed)
 
 
 async def detect_ghost_ping_in_edit(before, after, bot):
-    before_mentions = set(before.mentions)
-    after_mentions = set(after.mentions)
+    # Compared by id, names change
+    before_mentions = dict(zip(before.mention_ids, before.mentions))
+    after_mentions = dict(zip(after.mention_ids, after.mentions))
 
-    if before_mentions == after_mentions:
+    if before_mentions.keys() == after_mentions.keys():
         return
 
-    added_mentions = after_mentions - before_mentions
-    removed_mentions = before_mentions - after_mentions
+    added_mentions = [
+        name
+        for user_id, name in after_mentions.items()
+        if user_id not in before_mentions
+    ]
+    removed_mentions = [
+        name
+        for user_id, name in before_mentions.items()
+        if user_id not in after_mentions
+    ]
 
     response = "The mentions in the message have been edited.\n"
     if added_mentions:
-        response += f"Added mentions: {', '.join(user.name for user in added_mentions)}\n"  # noqa
+        response += f"Added mentions: {', '.join(added_mentions)}\n"  # noqa
     if removed_mentions:
-        response += f"Removed mentions: {', '.join(user.name for user in removed_mentions)}"  # noqa
+        response += f"Removed mentions: {', '.join(removed_mentions)}"  # noqa
 
     channel = bot.get_channel(BOT_LOG)
     if not channel:
@@ -264,8 +365,8 @@ async def detect_ghost_ping_in_edit(before, after, bot):
         description="A ghost ping was detected.",
         color=0xDD2E44,
     )
-    embed.add_field(name="Author", value=before.author.mention, inline=True)  # noqa
-    embed.add_field(name="Channel", value=before.channel.mention, inline=True)  # noqa
+    embed.add_field(name="Author", value=before.author_mention, inline=True)  # noqa
+    embed.add_field(name="Channel", value=before.channel_mention, inline=True)  # noqa
 
     embed.add_field(
         name="Mentions",
@@ -273,12 +374,40 @@ async def detect_ghost_ping_in_edit(before, after, bot):
         inline=False,
     )  # noqa
 
-    embed.set_footer(text=f"Message ID: {before.id} | Author ID: {before.author.id}")
+    embed.set_footer(
+        text=f"Message ID: {before.message_id} | Author ID: {before.author_id}"
+    )
+
+    log_dispatcher.post(channel, embed)
+
+
+def deleted_message_snapshot(message_id, cached_message):
+    """Returns the stored snapshot of a deleted message, or None if it is unknown."""
+    snapshot = message_store.pop(message_id)
+    if snapshot is None and cached_message is not None:
+        snapshot = MessageSnapshot.from_message(cached_message)
+    return snapshot
+
 
-    await channel.send(embed=embed)
+async def handle_raw_message_edit(payload, bot):
+    if payload.guild_id is None:
+        return
+
+    before = message_store.get(payload.message_id)
+    if before is None and payload.cached_message is not None:
+        before = MessageSnapshot.from_message(payload.cached_message)
+    after = message_store.add(payload.message)
 
+    # Link previews arrive as an edit, which makes the message exempt from
+    # duplicate checks
+    if after.has_embeds and not (before and before.has_embeds):
+        recent_messages.mark_embeds(after.message_id)
+        near_messages.mark_embeds(after.message_id)
+
+    if before is None:
+        logger.debug("Edited message %d is not stored", payload.message_id)
+        return
 
-async def handle_message_edit(before, after, bot):
     channel = bot.get_channel(BOT_LOG)
     if not channel:
         return
@@ -294,35 +423,48 @@ async def handle_message_edit(before, after, bot):
         description="A message was edited.",
         color=0xDD2E44,
     )
-    embed.add_field(name="Author", value=before.author.mention, inline=True)  # noqa
-    embed.add_field(name="Channel", value=before.channel.mention, inline=True)  # noqa
+    embed.add_field(name="Author", value=before.author_mention, inline=True)  # noqa
+    embed.add_field(name="Channel", value=before.channel_mention, inline=True)  # noqa
     embed.add_field(
         name="Content",
         value=safe_truncate(before.content, MAX_FIELD_VALUE),
         inline=False,
     )  # noqa
-    embed.set_footer(text=f"Message ID: {before.id} | Author ID: {before.author.id}")
+    embed.set_footer(
+        text=f"Message ID: {before.message_id} | Author ID: {before.author_id}"
+    )
 
-    await channel.send(embed=embed)
+    log_dispatcher.post(channel, embed)
     await detect_ghost_ping_in_edit(before, after, bot)
 
 
-async def handle_bulk_message_delete(messages, bot):
+async def handle_raw_bulk_message_delete(payload, bot):
+    cached_messages = {message.id: message for message in payload.cached_messages}
+    messages = []
+    for message_id in payload.message_ids:
+        recent_messages.discard(message_id)
+        near_messages.discard(message_id)
+        bot_replies.discard_reply(message_id)
+
+        message = deleted_message_snapshot(message_id, cached_messages.get(message_id))
+        if message is not None:
+            messages.append(message)
+
     channel = bot.get_channel(BOT_LOG)
     if not channel:
         return
 
     for message in messages:
         deleted_message = DeletedMessage(
-            message_id=message.id,
-            channel_id=message.channel.id,
-            author_id=message.author.id,
-            author_name=message.author.name,
-            content=message.content or "",
+            message_id=message.message_id,
+            channel_id=message.channel_id,
+            author_id=message.author_id,
+            author_name=message.author_name,
+            content=message.content,
             timestamp=message.created_at,
         )
 
-        write_deleted_message_to_collection(deleted_message)
+        log_deleted_message(deleted_message)
 
         embed = discord.Embed(
             title="Deleted Message",
@@ -330,10 +472,10 @@ async def handle_bulk_message_delete(messages, bot):
             color=0xDD2E44,
         )
         embed.add_field(
-            name="Author", value=message.author.mention, inline=True
+            name="Author", value=message.author_mention, inline=True
         )  # noqa
         embed.add_field(
-            name="Channel", value=message.channel.mention, inline=True
+            name="Channel", value=message.channel_mention, inline=True
         )  # noqa
         if message.content:
             embed.add_field(
@@ -342,46 +484,55 @@ async def handle_bulk_message_delete(messages, bot):
                 inline=False,
             )  # noqa
         embed.set_footer(
-            text=f"Message ID: {message.id} | Author ID: {message.author.id}"  # noqa
+            text=f"Message ID: {message.message_id} | Author ID: {message.author_id}"  # noqa
         )
 
-        await channel.send(embed=embed)
+        log_dispatcher.post(channel, embed)
+
 
+async def handle_raw_message_delete(payload, bot):
+    recent_messages.discard(payload.message_id)
+    near_messages.discard(payload.message_id)
+    bot_replies.discard_reply(payload.message_id)
+
+    message = deleted_message_snapshot(payload.message_id, payload.cached_message)
+    if message is None:
+        logger.debug("Deleted message %d is not stored", payload.message_id)
+        return
 
-async def handle_message_delete(message, bot):
     channel = bot.get_channel(BOT_LOG)
     if not channel:
         return
 
-    is_bot = message.author == bot.user
-    if is_bot and message.channel.id != BOT_LOG:
+    is_bot = message.author_id == bot.user.id
+    if is_bot and message.channel_id != BOT_LOG:
         return
 
     if is_bot:
-        await message.channel.send(
+        await channel.send(
             "You attempted to delete a message from a channel where messages are logged and stored indefinitely. Please refrain from doing so."  # noqa
         )  # noqa
         # It is impossible to recover the message at this point
         return
 
     deleted_message = DeletedMessage(
-        message_id=message.id,
-        channel_id=message.channel.id,
-        author_id=message.author.id,
-        author_name=message.author.name,
-        content=message.content or "",
+        message_id=message.message_id,
+        channel_id=message.channel_id,
+        author_id=message.author_id,
+        author_name=message.author_name,
+        content=message.content,
         timestamp=message.created_at,
     )
 
-    write_deleted_message_to_collection(deleted_message)
+    log_deleted_message(deleted_message)
 
     embed = discord.Embed(
         title="Deleted Message",
         description="A message was deleted.",
         color=0xDD2E44,
     )
-    embed.add_field(name="Author", value=message.author.mention, inline=True)  # noqa
-    embed.add_field(name="Channel", value=message.channel.mention, inline=True)  # noqa
+    embed.add_field(name="Author", value=message.author_mention, inline=True)  # noqa
+    embed.add_field(name="Channel", value=message.channel_mention, inline=True)  # noqa
     if message.content:
         embed.add_field(
             name="Content",
@@ -389,99 +540,290 @@ async def handle_message_delete(message, bot):
             inline=False,
         )  # noqa
 
-    try:
-        if message.reference is not None:
-            original_message = await message.channel.fetch_message(
-                message.reference.message_id
-            )
-
-            embed.add_field(
-                name="Replied",
-                value=original_message.author.mention,
-                inline=False,  # noqa
-            )  # noqa
-    except discord.NotFound:
-        logger.warning("Referenced message not found")
-    except discord.Forbidden:
-        logger.error("No permission to access the referenced message")
-    except discord.HTTPException as e:
-        logger.error(f"Error fetching message: {e}")
+    if message.reference_author_id is not None:
+        embed.add_field(
+            name="Replied",
+            value=f"<@{message.reference_author_id}>",
+            inline=False,  # noqa
+        )  # noqa
 
     embed.set_footer(
-        text=f"Message ID: {message.id} | Author ID: {message.author.id}"  # noqa
+        text=f"Message ID: {message.message_id} | Author ID: {message.author_id}"  # noqa
     )  # noqa
 
-    await channel.send(embed=embed)
+    log_dispatcher.post(channel, embed)
     await detect_ghost_ping(message, bot)
 
-    bot_reply = await was_message_replied_by_bot(message, bot)
+    message_channel = bot.get_channel(message.channel_id)
+    if not message_channel:
+        return
+
+    bot_reply = await was_message_replied_by_bot(message, message_channel, bot)
     if bot_reply:
-        await message.channel.send(
-            f"{message.author.mention} I thought we had something special going on, why did you delete your message?"
+        await message_channel.send(
+            f"{message.author_mention} I thought we had something special going on, why did you delete your message?"
         )
 
 
 async def handle_message(message, bot):
+    if message.guild is not None:
+        message_store.add(message)
+
     if message.author == bot.user:
+        if message.reference is not None and message.reference.message_id:
+            bot_replies.add(
+                message.reference.message_id, message.id, message.created_at
+            )
         return
 
     if message.guild is None:
         await handle_dm(message)
         return
 
-    # Too many mentions
-    if len(message.mentions) >= 3:
-        member = message.guild.get_member(message.author.id)
-        await timeout_member(member, timedelta(minutes=5), "Spamming mentions")
-        await message.delete()
-        return
+    track_message(message)
+
+    await message_rules.run(message)
+
+
+@message_rules.rule("rate_limit", priority=5)
+async def rate_limit(message, features):
+    # Every message is counted, so this runs before any rule that can stop.
+    # Reply pings are not counted as mentions, and a message counts once
+    # however many links it has, as the limits are about repeated messages.
+    if is_staff(message):
+        return False
+
+    user_id = features.author_id
+    # Every limiter records the message before deciding, so none undercounts
+    over_messages = message_rate.hit(user_id)
+    over_mentions = mention_rate.hit(user_id, features.explicit_mention_count)
+    over_links = link_rate.hit(user_id, int(features.has_url))
+    if over_messages:
+        reason = "Spamming messages"
+    elif over_mentions:
+        reason = "Spamming mentions"
+    elif over_links:
+        reason = "Spamming links"
+    else:
+        return False
+
+    for limiter in (message_rate, mention_rate, link_rate):
+        limiter.reset(user_id)
+
+    member = message.guild.get_member(user_id)
+    await moderation.execute(
+        message,
+        delete=True,
+        actions=[timeout_action(member, RATE_LIMIT_TIMEOUT, reason)],
+    )
+    return True
+
+
+@message_rules.rule(
+    "too_many_mentions", priority=10, when=lambda f: f.mention_count >= 3
+)
+async def too_many_mentions(message, features):
+    member = message.guild.get_member(message.author.id)
+    await moderation.execute(
+        message,
+        delete=True,
+        actions=[timeout_action(member, timedelta(minutes=5), "Spamming mentions")],
+    )
+    return True
+
+
+@message_rules.rule(
+    "too_many_embeds",
+    priority=20,
+    when=lambda f: f.embed_count > 2 or f.attachment_count > 3,
+)
+async def too_many_embeds(message, features):
+    member = message.guild.get_member(message.author.id)
+    await moderation.execute(
+        message,
+        delete=True,
+        actions=[timeout_action(member, timedelta(minutes=5), "Too many embeds")],
+    )
+    return True
+
+
+@message_rules.rule(
+    "too_many_image_links", priority=30, when=lambda f: f.image_link_count > 3
+)
+async def too_many_image_links(message, features):
+    member = message.guild.get_member(message.author.id)
+    await moderation.execute(
+        message,
+        delete=True,
+        actions=[timeout_action(member, timedelta(minutes=5), "Suspicious")],
+    )
+    return True
 
-    if len(message.embeds) > 2 or len(message.attachments) > 3:
-        member = message.guild.get_member(message.author.id)
-        await timeout_member(member, timedelta(minutes=5), "Too many embeds")
-        await message.delete()
-        return
 
-    image_pattern = r"\.(?:jpg|jpeg|png|gif|webp|bmp)\b"
-    raw_attachment_count = len(
-        re.findall(image_pattern, message.content, re.IGNORECASE)
+@message_rules.rule(
+    "torrent",
+    priority=40,
+    when=lambda f: not TORRENT_EXTENSIONS.isdisjoint(f.attachment_extensions),
+)
+async def torrent(message, features):
+    # Auto delete torrent if post in chat.
+    member = message.guild.get_member(message.author.id)
+    await moderation.execute(
+        message,
+        delete=True,
+        actions=[timeout_action(member, timedelta(minutes=120), "Torrents")],
     )
-    if raw_attachment_count > 3:
-        member = message.guild.get_member(message.author.id)
-        await timeout_member(member, timedelta(minutes=5), "Suspicious")
-        await message.delete()
-        return
+    return True
 
-    # Auto delete torrent if post in chat.
-    for file in message.attachments:
-        if file.filename.endswith((".torrent", ".TORRENT")):
-            member = message.guild.get_member(message.author.id)
-            await timeout_member(member, timedelta(minutes=120), "Torrents")
-            await message.delete()
-            return
-
-    if await handle_at_everyone(message):
-        return
 
-    if await handle_crazy(message):
-        return
+@message_rules.rule("at_everyone", priority=50, when=lambda f: f.mentions_everyone)
+async def at_everyone(message, features):
+    return await handle_at_everyone(message)
 
-    if await handle_hate_me(message):
-        return
 
-    await is_message_a_duplicate(message)
+@message_rules.rule("crazy", priority=60, when=lambda f: f.author_id == CRAZY_USER_ID)
+async def crazy(message, features):
+    return await handle_crazy(message)
 
-    if (
-        "http" in message.content
-        and not message.embeds
-        and message.channel.id == GENERAL_CHANNEL
-    ):
-        try:
-            # Try to fetch the message to see if it still exists
-            await message.channel.fetch_message(message.id)
-            await message.reply("You do not have embed permissions on this server")
-        except discord.NotFound:
-            logger.warning(
-                f"Message {message.id} was deleted before reply could be sent in channel {message.channel.id}"
-            )
-            pass
+
+@message_rules.rule(
+    "hate_me", priority=70, when=lambda f: f.author_id == HATE_ME_USER_ID
+)
+async def hate_me(message, features):
+    return await handle_hate_me(message)
+
+
+def is_staff(message) -> bool:
+    """Whether the author of a guild message is a moderator or an admin."""
+    author = message.author
+    if any(role.id == ADMIN_ROLE_ID for role in getattr(author, "roles", ())):
+        return True
+    return message.channel.permissions_for(author).manage_messages
+
+
+def has_only_safe_links(content: str) -> bool:
+    domains = [domain.lower() for domain in LINK_DOMAIN_PATTERN.findall(content)]
+    return bool(domains) and all(
+        any(domain == safe or domain.endswith("." + safe) for safe in SAFE_LINK_DOMAINS)
+        for domain in domains
+    )
+
+
+def is_new_account(member, now) -> bool:
+    if now - member.created_at < NEW_ACCOUNT_AGE:
+        return True
+    joined_at = getattr(member, "joined_at", None)
+    return joined_at is not None and now - joined_at < NEW_MEMBER_AGE
+
+
+async def handle_spam_burst(message):
+    """
+    Handles a message whose text was just sent by several other accounts.
+
+    The message is removed and its author timed out only if the author has a
+    new account or the burst spans several channels. Otherwise the burst is
+    logged once, when it reaches BURST_AUTHORS accounts, and left alone.
+    """
+    if is_staff(message) or has_only_safe_links(message.content):
+        return False
+
+    entry = near_messages.get(message.id)
+    if entry is None:
+        return False
+
+    now = aware_utcnow()
+    burst = near_messages.find_burst(entry, now)
+    if not burst:
+        return False
+
+    authors = {other.author_id for other in burst}
+    authors.discard(message.author.id)
+    channels = {other.channel_id for other in burst}
+    channels.add(message.channel.id)
+
+    act = is_new_account(message.author, now) or len(channels) >= BURST_CHANNELS
+    if not act and len(authors) + 1 != BURST_AUTHORS:
+        # Logged when the burst was first detected
+        return False
+
+    logger.info(
+        f"Detected spam burst from {message.author.name} ({message.author.id}), "
+        f"{len(burst)} similar messages in {len(channels)} channels"
+    )
+
+    if act:
+        member = message.guild.get_member(message.author.id)
+        await moderation.execute(
+            message,
+            delete=True,
+            actions=[timeout_action(member, SPAM_BURST_TIMEOUT, "Spam burst")],
+        )
+
+    channel = message.guild.get_channel(BOT_LOG)
+    if channel:
+        outcome = "was removed" if act else "was left alone"
+        embed = discord.Embed(
+            title="Spam Burst",
+            description=f"A message similar to {len(burst)} recent messages from {len(authors)} other accounts {outcome}.",
+            color=0xDD2E44,
+        )
+        embed.add_field(name="Author", value=message.author.mention, inline=True)
+        embed.add_field(name="Channel", value=message.channel.mention, inline=True)
+        embed.add_field(
+            name="Content",
+            value=safe_truncate(message.content, MAX_FIELD_VALUE),
+            inline=False,
+        )
+        embed.add_field(
+            name="Other Accounts",
+            value=safe_truncate(
+                ", ".join(f"<@{author_id}>" for author_id in authors), MAX_FIELD_VALUE
+            ),
+            inline=False,
+        )
+        embed.set_footer(
+            text=f"Message ID: {message.id} | Author ID: {message.author.id}"
+        )
+        log_dispatcher.post(channel, embed)
+
+    return act
+
+
+@message_rules.rule(
+    "spam_burst",
+    priority=75,
+    when=lambda f: f.has_content and (f.has_url or f.explicit_mention_count > 0),
+)
+async def spam_burst(message, features):
+    # Many people can say the same short thing at once, spam comes with a link
+    # or a mention. Replies to the same person are not, as reply pings do not
+    # count as explicit mentions.
+    return await handle_spam_burst(message)
+
+
+@message_rules.rule(
+    "duplicate",
+    priority=80,
+    when=lambda f: f.has_content and not f.attachment_count,
+    final=False,
+)
+async def duplicate(message, features):
+    return await is_message_a_duplicate(message)
+
+
+@message_rules.rule(
+    "missing_embed_permissions",
+    priority=90,
+    when=lambda f: f.has_url and not f.embed_count and f.channel_id == GENERAL_CHANNEL,
+)
+async def missing_embed_permissions(message, features):
+    try:
+        # Try to fetch the message to see if it still exists
+        await message.channel.fetch_message(message.id)
+        await message.reply("You do not have embed permissions on this server")
+        return True
+    except discord.NotFound:
+        logger.warning(
+            f"Message {message.id} was deleted before reply could be sent in channel {message.channel.id}"
+        )
+        return False
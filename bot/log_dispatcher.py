@@ -0,0 +1,133 @@
+import asyncio
+from collections import Counter, deque
+
+import discord
+
+from bot.log import logger
+
+# Discord limits per message
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARACTERS = 6000
+
+LOG_FLUSH_INTERVAL = 1.0  # seconds
+MAX_LOG_BACKLOG = 500
+
+
+class _ChannelQueue:
+    __slots__ = ("channel", "embeds", "dropped", "timer", "scheduled", "lock")
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.embeds: deque[discord.Embed] = deque()
+        # Embed title -> number of embeds dropped since the last flush
+        self.dropped: Counter[str] = Counter()
+        self.timer = None
+        self.scheduled = False
+        self.lock = asyncio.Lock()
+
+
+def pack_embeds(embeds: deque) -> list[discord.Embed]:
+    """
+    Takes as many embeds from the front of embeds as fit in a single message.
+    A single embed over the character limit is sent on its own.
+    """
+    batch = [embeds.popleft()]
+    characters = len(batch[0])
+    while embeds and len(batch) < MAX_EMBEDS_PER_MESSAGE:
+        size = len(embeds[0])
+        if characters + size > MAX_EMBED_CHARACTERS:
+            break
+        batch.append(embeds.popleft())
+        characters += size
+    return batch
+
+
+def dropped_summary(dropped: Counter) -> discord.Embed:
+    lines = [f"{count}x {title}" for title, count in dropped.most_common()]
+    return discord.Embed(
+        title="Dropped Log Entries",
+        description=(
+            f"{sum(dropped.values())} log entries were dropped during a flood.\n"
+            + "\n".join(lines)
+        )[:4096],
+        color=0xDD2E44,
+    )
+
+
+class LogDispatcher:
+    """
+    Queues log embeds per channel and sends them packed, up to 10 embeds per
+    message within the total character limit.
+
+    A queue is flushed interval seconds after its first embed arrived, or as
+    soon as a full message is queued. Each queue holds at most max_backlog
+    embeds, further embeds are dropped and reported in a summary embed.
+    """
+
+    def __init__(
+        self, interval: float = LOG_FLUSH_INTERVAL, max_backlog: int = MAX_LOG_BACKLOG
+    ):
+        self.interval = interval
+        self.max_backlog = max_backlog
+
+        self._queues: dict[int, _ChannelQueue] = {}
+        self._tasks = set()
+
+    def post(self, channel, embed: discord.Embed):
+        queue = self._queues.get(channel.id)
+        if queue is None:
+            queue = self._queues[channel.id] = _ChannelQueue(channel)
+
+        if len(queue.embeds) >= self.max_backlog:
+            queue.dropped[embed.title or "Untitled"] += 1
+        else:
+            queue.embeds.append(embed)
+
+        if len(queue.embeds) >= MAX_EMBEDS_PER_MESSAGE:
+            self._schedule_flush(queue)
+        elif queue.timer is None:
+            loop = asyncio.get_running_loop()
+            queue.timer = loop.call_later(self.interval, self._schedule_flush, queue)
+
+    def _schedule_flush(self, queue: _ChannelQueue):
+        if queue.timer is not None:
+            queue.timer.cancel()
+            queue.timer = None
+        # A pending flush sends everything queued until it is done
+        if queue.scheduled:
+            return
+        queue.scheduled = True
+
+        task = asyncio.create_task(self._flush(queue))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, queue: _ChannelQueue):
+        # Sends to a channel go out in order, one at a time
+        async with queue.lock:
+            queue.scheduled = False
+            while queue.embeds or queue.dropped:
+                if queue.embeds:
+                    batch = pack_embeds(queue.embeds)
+                else:
+                    batch = [dropped_summary(queue.dropped)]
+                    queue.dropped.clear()
+
+                try:
+                    await queue.channel.send(embeds=batch)
+                except discord.HTTPException as e:
+                    logger.error("Failed to send %d log embeds: %s", len(batch), e)
+
+    async def close(self):
+        """Sends everything still queued."""
+        for queue in self._queues.values():
+            if queue.timer is not None:
+                queue.timer.cancel()
+                queue.timer = None
+            await self._flush(queue)
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+log_dispatcher = LogDispatcher()
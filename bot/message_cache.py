@@ -0,0 +1,205 @@
+import heapq
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import discord
+
+MAX_TRACKED_REPLIES = 20_000
+
+MESSAGE_STORE_BUDGET = 64 * 1024 * 1024  # bytes
+MESSAGE_STORE_MAX_AGE = timedelta(days=7)
+
+# Estimated bytes used by a snapshot besides its strings: the object, its
+# integers and the OrderedDict entry holding it
+SNAPSHOT_OVERHEAD = 250
+
+
+@dataclass(slots=True)
+class MessageSnapshot:
+    message_id: int
+    channel_id: int
+    author_id: int
+    author_name: str
+    content: str
+    reference_id: int | None
+    reference_author_id: int | None
+    # Ids identify the mentioned users, names are only for display
+    mention_ids: tuple[int, ...]
+    mentions: tuple[str, ...]
+    has_embeds: bool
+
+    @property
+    def created_at(self) -> datetime:
+        return discord.utils.snowflake_time(self.message_id)
+
+    @property
+    def author_mention(self) -> str:
+        return f"<@{self.author_id}>"
+
+    @property
+    def channel_mention(self) -> str:
+        return f"<#{self.channel_id}>"
+
+    @classmethod
+    def from_message(cls, message: discord.Message) -> "MessageSnapshot":
+        reference_id = None
+        reference_author_id = None
+        if message.reference is not None:
+            reference_id = message.reference.message_id
+            if isinstance(message.reference.resolved, discord.Message):
+                reference_author_id = message.reference.resolved.author.id
+
+        return cls(
+            message_id=message.id,
+            channel_id=message.channel.id,
+            author_id=message.author.id,
+            # The same few authors send most messages
+            author_name=sys.intern(message.author.name),
+            content=message.content or "",
+            reference_id=reference_id,
+            reference_author_id=reference_author_id,
+            mention_ids=tuple(user.id for user in message.mentions),
+            mentions=tuple(sys.intern(user.name) for user in message.mentions),
+            has_embeds=bool(message.embeds),
+        )
+
+    def size(self) -> int:
+        """Estimated number of bytes kept alive by this snapshot."""
+        return (
+            SNAPSHOT_OVERHEAD
+            + sys.getsizeof(self.content)
+            + sum(sys.getsizeof(name) for name in self.mentions)
+            + sum(sys.getsizeof(user_id) for user_id in self.mention_ids)
+        )
+
+
+class MessageStore:
+    """
+    Snapshots of recent guild messages, so edits and deletions of messages that
+    discord.py no longer caches can still be logged without REST calls.
+
+    Snapshots are kept in the order they were first stored, which is creation
+    order except for older messages first seen through an edit. Those are also
+    tracked in a heap, so every snapshot is evicted once it is older than
+    max_age. Once the estimated memory use exceeds budget, snapshots are
+    evicted first stored first.
+    """
+
+    def __init__(
+        self,
+        budget: int = MESSAGE_STORE_BUDGET,
+        max_age: timedelta = MESSAGE_STORE_MAX_AGE,
+    ):
+        self.budget = budget
+        self.max_age = max_age
+        self.size = 0
+        self._snapshots: OrderedDict[int, MessageSnapshot] = OrderedDict()
+        # Ids of snapshots stored after newer ones, oldest first
+        self._out_of_order: list[int] = []
+
+    def __len__(self):
+        return len(self._snapshots)
+
+    def add(self, message: discord.Message) -> MessageSnapshot:
+        """Stores a snapshot of a new or edited message and returns it."""
+        snapshot = MessageSnapshot.from_message(message)
+
+        old = self._snapshots.get(snapshot.message_id)
+        if old is not None:
+            # Replaced in place, edits do not make a message any younger
+            self.size -= old.size()
+            # Edits do not resolve the replied message again
+            if snapshot.reference_author_id is None:
+                snapshot.reference_author_id = old.reference_author_id
+
+        if snapshot.reference_id is not None and snapshot.reference_author_id is None:
+            referenced = self._snapshots.get(snapshot.reference_id)
+            if referenced is not None:
+                snapshot.reference_author_id = referenced.author_id
+
+        if (
+            old is None
+            and self._snapshots
+            and snapshot.message_id < next(reversed(self._snapshots))
+        ):
+            heapq.heappush(self._out_of_order, snapshot.message_id)
+
+        self._snapshots[snapshot.message_id] = snapshot
+        self.size += snapshot.size()
+        self._evict()
+        return snapshot
+
+    def _evict(self):
+        # Snowflakes sort by creation time, no need to build datetimes
+        cutoff = discord.utils.time_snowflake(datetime.now(timezone.utc) - self.max_age)
+        while self._snapshots:
+            oldest = next(iter(self._snapshots.values()))
+            if self.size <= self.budget and oldest.message_id >= cutoff:
+                break
+            del self._snapshots[oldest.message_id]
+            self.size -= oldest.size()
+
+        while self._out_of_order and self._out_of_order[0] < cutoff:
+            # Evicted or deleted already if it is gone
+            self.pop(heapq.heappop(self._out_of_order))
+
+    def get(self, message_id: int) -> MessageSnapshot | None:
+        return self._snapshots.get(message_id)
+
+    def pop(self, message_id: int) -> MessageSnapshot | None:
+        snapshot = self._snapshots.pop(message_id, None)
+        if snapshot is not None:
+            self.size -= snapshot.size()
+        return snapshot
+
+
+class BotReplyIndex:
+    """
+    Bounded index of the replies the bot sent, keyed by the id of the message
+    it replied to.
+
+    The index is authoritative for messages created after `since`, the start of
+    the bot or the creation time of the newest evicted reply, whichever is later.
+    Older messages may have been replied to before the index knew about it.
+    """
+
+    def __init__(self, max_entries: int = MAX_TRACKED_REPLIES):
+        self.max_entries = max_entries
+        self.since = datetime.now(timezone.utc)
+        # referenced message id -> (reply id, reply created_at)
+        self._replies: OrderedDict[int, tuple[int, datetime]] = OrderedDict()
+        # reply id -> referenced message id
+        self._referenced: dict[int, int] = {}
+
+    def __len__(self):
+        return len(self._replies)
+
+    def add(self, referenced_id: int, reply_id: int, created_at: datetime):
+        old = self._replies.pop(referenced_id, None)
+        if old is not None:
+            self._referenced.pop(old[0], None)
+
+        self._replies[referenced_id] = (reply_id, created_at)
+        self._referenced[reply_id] = referenced_id
+
+        while len(self._replies) > self.max_entries:
+            _, (evicted_id, evicted_at) = self._replies.popitem(last=False)
+            self._referenced.pop(evicted_id, None)
+            self.since = max(self.since, evicted_at)
+
+    def covers(self, created_at: datetime) -> bool:
+        """Whether a reply to a message created at created_at would be indexed."""
+        return created_at >= self.since
+
+    def get(self, referenced_id: int) -> int | None:
+        """Returns the id of the bot's reply to a message, if any."""
+        reply = self._replies.get(referenced_id)
+        return reply[0] if reply else None
+
+    def discard_reply(self, reply_id: int):
+        """Forgets a reply of the bot that was deleted."""
+        referenced_id = self._referenced.pop(reply_id, None)
+        if referenced_id is not None:
+            del self._replies[referenced_id]
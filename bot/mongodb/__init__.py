@@ -1 +1,21 @@
-from .load_db import load_chat_messages_from_db, read_random_message_from_collection
+from .aio import (
+    close_mongodb,
+    find_deleted_messages_async,
+    run_in_background,
+    run_mongodb,
+)
+from .archive import archive_old_deleted_messages, iter_archived_messages
+from .deleted_messages import (
+    flush_deleted_messages,
+    log_deleted_message,
+    replay_spool,
+)
+from .load_db import (
+    DELETED_PAGE_SIZE,
+    DeletedMessage,
+    ensure_deleted_message_indexes,
+    iter_messages_from_collection,
+    load_chat_messages_from_db,
+    read_random_message_from_collection,
+)
+from .message_pool import get_random_message, random_message_pool
@@ -0,0 +1,81 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from bot.log import logger
+
+from .load_db import (
+    DELETED_PAGE_SIZE,
+    close_mongodb_client,
+    find_deleted_messages,
+)
+from .spool import deleted_message_spool
+
+# pymongo is synchronous, so its calls run on a small dedicated thread pool.
+# The number of queued and running calls is capped, so an unreachable server
+# cannot pile up work behind the event loop.
+MONGO_MAX_WORKERS = 4
+MONGO_MAX_PENDING = 200
+MONGO_OPERATION_TIMEOUT = 15  # seconds
+
+_executor = ThreadPoolExecutor(
+    max_workers=MONGO_MAX_WORKERS, thread_name_prefix="mongodb"
+)
+_slots = threading.BoundedSemaphore(MONGO_MAX_PENDING)
+_background_tasks = set()
+
+
+async def run_mongodb(func, *args, default=None, timeout=MONGO_OPERATION_TIMEOUT):
+    """
+    Runs a blocking MongoDB function on the MongoDB thread pool.
+
+    Returns default instead if the pool is saturated or the call does not
+    finish within timeout. A timed out call keeps its slot until it returns.
+    """
+    if not _slots.acquire(blocking=False):
+        logger.warning(
+            "Too many pending MongoDB operations, skipping %s", func.__name__
+        )
+        return default
+
+    try:
+        future = _executor.submit(functools.partial(func, *args))
+    except RuntimeError:
+        # The pool is shut down
+        _slots.release()
+        return default
+    future.add_done_callback(lambda _: _slots.release())
+
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except asyncio.TimeoutError:
+        logger.error("MongoDB operation %s timed out after %ss", func.__name__, timeout)
+        return default
+
+
+def run_in_background(coro):
+    """Schedules a coroutine without awaiting it, keeping a reference until it is done."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def find_deleted_messages_async(
+    author_id: int | None = None,
+    channel_id: int | None = None,
+    text: str | None = None,
+    before=None,
+    limit: int = DELETED_PAGE_SIZE,
+) -> list[dict]:
+    return await run_mongodb(
+        find_deleted_messages, author_id, channel_id, text, before, limit, default=[]
+    )
+
+
+def close_mongodb():
+    """Waits for running MongoDB calls, drops queued ones and closes the client."""
+    _executor.shutdown(wait=True, cancel_futures=True)
+    close_mongodb_client()
+    deleted_message_spool.close()
@@ -0,0 +1,182 @@
+import gzip
+import json
+import os
+from collections import defaultdict
+from collections.abc import Iterator
+from datetime import date, datetime, timedelta, timezone
+
+from pymongo import ASCENDING
+
+from bot.log import logger
+
+from .aio import run_mongodb
+from .load_db import (
+    DeletedMessage,
+    ensure_deleted_message_indexes,
+    get_mongodb_client,
+)
+
+ARCHIVE_DIR = os.path.join(
+    os.getenv("BOT_DATA_DIR", "/bot-data"), "deleted_messages_archive"
+)
+
+# Deleted messages stay in MongoDB for this long before they are archived
+HOT_RETENTION = timedelta(days=90)
+ARCHIVE_BATCH_SIZE = 5000
+
+
+def _to_ms(value: datetime) -> int:
+    # MongoDB returns naive datetimes in UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def _from_ms(value: int) -> datetime:
+    return datetime.fromtimestamp(value / 1000, timezone.utc)
+
+
+def archive_path(day: date, archive_dir: str = ARCHIVE_DIR) -> str:
+    return os.path.join(archive_dir, f"{day.isoformat()}.jsonl.gz")
+
+
+def write_archive_partition(path: str, docs: list[dict]):
+    """
+    Appends deleted message documents to a partition as one gzip member.
+
+    The member starts with a table of the author names it references, records
+    only keep the author id and store datetimes as epoch milliseconds.
+    """
+    authors = {}
+    for doc in docs:
+        authors[str(doc["author_id"])] = doc["author_name"]
+
+    lines = [json.dumps({"authors": authors}, separators=(",", ":"))]
+    for doc in docs:
+        lines.append(
+            json.dumps(
+                [
+                    doc["message_id"],
+                    doc["channel_id"],
+                    doc["author_id"],
+                    _to_ms(doc["timestamp"]),
+                    _to_ms(doc["deleted_at"]),
+                    doc["content"],
+                ],
+                separators=(",", ":"),
+                ensure_ascii=False,
+            )
+        )
+
+    data = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"))
+    # gzip readers treat concatenated members as one stream
+    with open(path, "ab") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_archive_partition(path: str) -> Iterator[DeletedMessage]:
+    authors = {}
+    seen = set()
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if isinstance(record, dict):
+                authors.update(record["authors"])
+                continue
+
+            message_id, channel_id, author_id, timestamp, deleted_at, content = record
+            # A run interrupted before deleting from MongoDB archives again
+            if message_id in seen:
+                continue
+            seen.add(message_id)
+
+            yield DeletedMessage(
+                message_id=message_id,
+                channel_id=channel_id,
+                author_id=author_id,
+                author_name=authors.get(str(author_id), ""),
+                content=content,
+                timestamp=_from_ms(timestamp),
+                deleted_at=_from_ms(deleted_at),
+            )
+
+
+def iter_archived_messages(
+    start: date, end: date, archive_dir: str = ARCHIVE_DIR
+) -> Iterator[DeletedMessage]:
+    """
+    Streams archived deleted messages deleted between start and end, inclusive,
+    one day partition at a time.
+    """
+    day = start
+    while day <= end:
+        path = archive_path(day, archive_dir)
+        if os.path.exists(path):
+            yield from read_archive_partition(path)
+        day += timedelta(days=1)
+
+
+def archive_deleted_messages_batch(
+    cutoff: datetime,
+    limit: int = ARCHIVE_BATCH_SIZE,
+    archive_dir: str = ARCHIVE_DIR,
+    database="discord_bot",
+    collection="deleted_messages",
+) -> int | None:
+    """
+    Moves up to limit of the oldest deleted messages deleted before cutoff from
+    MongoDB to the archive. Messages are only removed from MongoDB once their
+    partition is synced to disk.
+
+    Returns:
+        int or None: number of archived messages, None if archiving failed
+    """
+    try:
+        client = get_mongodb_client()
+        col = client[database][collection]
+
+        docs = list(
+            col.find({"deleted_at": {"$lt": cutoff}}, {"_id": 0})
+            .sort("deleted_at", ASCENDING)
+            .limit(limit)
+            .hint("deleted_at")
+        )
+        if not docs:
+            return 0
+
+        partitions = defaultdict(list)
+        for doc in docs:
+            partitions[_from_ms(_to_ms(doc["deleted_at"])).date()].append(doc)
+
+        os.makedirs(archive_dir, exist_ok=True)
+        for day, day_docs in partitions.items():
+            write_archive_partition(archive_path(day, archive_dir), day_docs)
+
+        col.delete_many({"message_id": {"$in": [doc["message_id"] for doc in docs]}})
+        return len(docs)
+    except Exception as e:
+        logger.error(f"Failed to archive deleted messages: {e}")
+        return None
+
+
+async def archive_old_deleted_messages() -> int:
+    """Archives every deleted message older than HOT_RETENTION, batch by batch."""
+    # The first pass runs before the events extension created the indexes,
+    # and the batch query is hinted to the deleted_at index
+    await run_mongodb(ensure_deleted_message_indexes)
+
+    cutoff = datetime.now(timezone.utc) - HOT_RETENTION
+    archived = 0
+
+    while True:
+        count = await run_mongodb(archive_deleted_messages_batch, cutoff, default=None)
+        if not count:
+            break
+        archived += count
+
+    if archived:
+        logger.info("Archived %d deleted messages older than %s", archived, cutoff)
+    return archived
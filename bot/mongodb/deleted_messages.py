@@ -0,0 +1,144 @@
+import asyncio
+import time
+
+from bot.log import logger
+from bot.metrics import Histogram
+
+from .aio import run_mongodb
+from .load_db import (
+    DeletedMessage,
+    upsert_deleted_messages_to_collection,
+    write_deleted_messages_to_collection,
+)
+from .spool import REPLAY_BATCH_SIZE, deleted_message_spool
+
+DELETED_BATCH_SIZE = 100
+DELETED_FLUSH_INTERVAL = 2.0  # seconds
+
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+
+class DeletedMessageSink:
+    """
+    Buffers deleted messages and writes them to MongoDB with one insert_many
+    per batch, once batch_size messages are buffered or interval seconds after
+    the first one arrived. Batches that cannot be written are spooled to disk
+    and replayed later by `replay_spool`.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = DELETED_BATCH_SIZE,
+        interval: float = DELETED_FLUSH_INTERVAL,
+    ):
+        self.batch_size = batch_size
+        self.interval = interval
+
+        self._buffer: list[DeletedMessage] = []
+        self._timer = None
+        self._tasks = set()
+
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.flush_latency = Histogram()
+        self.failed_batches = 0
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def add(self, deleted_message: DeletedMessage):
+        self._buffer.append(deleted_message)
+
+        if len(self._buffer) >= self.batch_size:
+            self._schedule_flush()
+        elif self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.interval, self._schedule_flush)
+
+    def _schedule_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        task = asyncio.create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+
+        start = time.perf_counter()
+        written = await run_mongodb(
+            write_deleted_messages_to_collection, batch, default=False
+        )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self.batch_sizes.observe(len(batch))
+        self.flush_latency.observe(elapsed_ms)
+        if not written:
+            self.failed_batches += 1
+            await deleted_message_spool.run(deleted_message_spool.append, batch)
+            logger.warning("Spooled a batch of %d deleted messages", len(batch))
+
+        logger.debug("Flushed %d deleted messages in %.1f ms", len(batch), elapsed_ms)
+
+    async def close(self):
+        """Flushes everything still buffered or being flushed."""
+        await self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        logger.info(
+            "Deleted message sink: batch sizes %s, flush latency (ms) %s, %d failed batches",
+            self.batch_sizes.summary(),
+            self.flush_latency.summary(),
+            self.failed_batches,
+        )
+
+
+deleted_message_sink = DeletedMessageSink()
+
+
+def log_deleted_message(deleted_message: DeletedMessage):
+    """Queues a deleted message for storage, never blocking the caller."""
+    deleted_message_sink.add(deleted_message)
+
+
+async def flush_deleted_messages():
+    await deleted_message_sink.close()
+
+
+async def replay_spool() -> int:
+    """
+    Moves spooled deleted messages to MongoDB, oldest first, until the spool is
+    empty or a batch fails. Messages are only removed from the spool once they
+    are written, and writes are upserts, so an interrupted replay is repeatable.
+
+    Returns:
+        int: The number of replayed messages
+    """
+    spool = deleted_message_spool
+    replayed = 0
+
+    while True:
+        batch = await spool.run(spool.peek, REPLAY_BATCH_SIZE)
+        if not batch:
+            break
+
+        written = await run_mongodb(
+            upsert_deleted_messages_to_collection, batch, default=False
+        )
+        if not written:
+            break
+
+        await spool.run(spool.remove, [message.message_id for message in batch])
+        replayed += len(batch)
+
+    if replayed:
+        logger.info("Replayed %d spooled deleted messages", replayed)
+    return replayed
@@ -1,13 +1,26 @@
 import os
+import threading
+from collections.abc import Iterator
 from datetime import datetime, timezone
 from dataclasses import dataclass, asdict, field
 
 from bot.log import logger
 
-from pymongo import MongoClient
+from pymongo import ASCENDING, DESCENDING, TEXT, MongoClient, UpdateOne
 
 MONGO_URI = os.getenv("MONGO_URI")
 
+MONGO_MAX_POOL_SIZE = 10
+MONGO_CONNECT_TIMEOUT_MS = 5000
+MONGO_SERVER_SELECTION_TIMEOUT_MS = 5000
+MONGO_SOCKET_TIMEOUT_MS = 10000
+
+CORPUS_BATCH_SIZE = 1000
+DELETED_PAGE_SIZE = 10
+
+_client = None
+_client_lock = threading.Lock()
+
 
 @dataclass
 class DeletedMessage:
@@ -31,29 +44,265 @@ def get_mongodb_uri():
     return MONGO_URI
 
 
+def get_mongodb_client() -> MongoClient:
+    """
+    Returns the process-wide MongoClient, creating it on first use.
+
+    MongoClient is thread-safe and pools its connections, so every caller
+    shares it instead of paying for a new connection and server discovery.
+    """
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            _client = MongoClient(
+                get_mongodb_uri(),
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+            )
+            logger.info("Created MongoDB client")
+
+        return _client
+
+
+def close_mongodb_client():
+    """Closes the shared MongoClient, if it was ever created."""
+    global _client
+
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+            logger.info("Closed MongoDB client")
+
+
 def write_deleted_message_to_collection(
     deleted_message: DeletedMessage,
     database="discord_bot",
     collection="deleted_messages",
 ):
-    mongo_uri = get_mongodb_uri()
+    try:
+        client = get_mongodb_client()
+        db = client[database]
+        col = db[collection]
+
+        logger.debug(f"Using MongoDB DB='{database}', Collection='{collection}'")
+
+        result = col.insert_one(deleted_message.to_dict())
+        logger.debug(f"Deleted message logged with _id: {result.inserted_id}")
+    except Exception as e:
+        logger.error(f"Failed to write a deleted message to MongoDB: {e}")
+        return []
+
+
+def write_deleted_messages_to_collection(
+    deleted_messages: list[DeletedMessage],
+    database="discord_bot",
+    collection="deleted_messages",
+) -> bool:
+    """
+    Writes a batch of deleted messages with a single unordered insert_many.
+
+    Returns:
+        bool: True if every message was written
+    """
+    try:
+        client = get_mongodb_client()
+        col = client[database][collection]
+
+        result = col.insert_many(
+            [message.to_dict() for message in deleted_messages], ordered=False
+        )
+        logger.debug(f"Logged {len(result.inserted_ids)} deleted messages")
+        return True
+    except Exception as e:
+        logger.error(
+            f"Failed to write {len(deleted_messages)} deleted messages to MongoDB: {e}"
+        )
+        return False
+
 
+def upsert_deleted_messages_to_collection(
+    deleted_messages: list[DeletedMessage],
+    database="discord_bot",
+    collection="deleted_messages",
+) -> bool:
+    """
+    Idempotently writes a batch of deleted messages, keyed on message_id, so
+    replaying a batch that was partially written before creates no duplicates.
+
+    Returns:
+        bool: True if every message was written
+    """
+    try:
+        client = get_mongodb_client()
+        col = client[database][collection]
+
+        result = col.bulk_write(
+            [
+                UpdateOne(
+                    {"message_id": message.message_id},
+                    {"$setOnInsert": message.to_dict()},
+                    upsert=True,
+                )
+                for message in deleted_messages
+            ],
+            ordered=False,
+        )
+        logger.debug(f"Replayed {result.upserted_count} deleted messages")
+        return True
+    except Exception as e:
+        logger.error(
+            f"Failed to replay {len(deleted_messages)} deleted messages to MongoDB: {e}"
+        )
+        return False
+
+
+DELETED_INDEXES = {
+    "message_id": [("message_id", ASCENDING)],
+    "author_deleted_at": [
+        ("author_id", ASCENDING),
+        ("deleted_at", DESCENDING),
+        ("message_id", DESCENDING),
+    ],
+    "channel_deleted_at": [
+        ("channel_id", ASCENDING),
+        ("deleted_at", DESCENDING),
+        ("message_id", DESCENDING),
+    ],
+    "content_text": [("content", TEXT)],
+    # Used by the archiver to find messages past retention
+    "deleted_at": [("deleted_at", ASCENDING)],
+}
+
+
+def ensure_deleted_message_indexes(
+    database="discord_bot",
+    collection="deleted_messages",
+):
+    """Creates the indexes of the deleted messages collection if they are missing."""
     try:
-        with MongoClient(mongo_uri) as client:
-            db = client[database]
-            col = db[collection]
+        client = get_mongodb_client()
+        col = client[database][collection]
+
+        for name, keys in DELETED_INDEXES.items():
+            col.create_index(keys, name=name)
+        logger.info("Ensured indexes on %s.%s", database, collection)
+    except Exception as e:
+        logger.error(f"Failed to create indexes on deleted messages: {e}")
 
-            logger.debug(
-                f"Connecting to MongoDB at {mongo_uri}, DB='{database}', Collection='{collection}'"
+
+def find_deleted_messages(
+    author_id: int | None = None,
+    channel_id: int | None = None,
+    text: str | None = None,
+    before: tuple[datetime, int] | None = None,
+    limit: int = DELETED_PAGE_SIZE,
+    database="discord_bot",
+    collection="deleted_messages",
+) -> list[dict]:
+    """
+    Finds deleted messages by author, channel and/or text, newest first.
+
+    Every query is served by an index, a query matching none of them returns
+    nothing rather than scanning the collection. Pages are keyed on the
+    (deleted_at, message_id) of the last message of the previous page.
+
+    Args:
+        author_id (int): Only messages by this user
+        channel_id (int): Only messages from this channel
+        text (str): Only messages matching this text search
+        before (tuple): Only messages deleted before this (deleted_at, message_id)
+        limit (int): Maximum number of messages to return
+
+    Returns:
+        list: message documents, empty if none were found or the query failed
+    """
+    if author_id is None and channel_id is None and not text:
+        logger.warning("Refusing to query deleted messages without a filter")
+        return []
+
+    query = {}
+    if author_id is not None:
+        query["author_id"] = author_id
+    if channel_id is not None:
+        query["channel_id"] = channel_id
+    if text:
+        query["$text"] = {"$search": text}
+    if before is not None:
+        deleted_at, message_id = before
+        query["$or"] = [
+            {"deleted_at": {"$lt": deleted_at}},
+            {"deleted_at": deleted_at, "message_id": {"$lt": message_id}},
+        ]
+
+    try:
+        client = get_mongodb_client()
+        col = client[database][collection]
+
+        cursor = (
+            col.find(query, {"_id": 0})
+            .sort([("deleted_at", DESCENDING), ("message_id", DESCENDING)])
+            .limit(limit)
+        )
+        # $text queries always use the text index and cannot be hinted
+        if not text:
+            cursor = cursor.hint(
+                "author_deleted_at" if author_id is not None else "channel_deleted_at"
             )
 
-            result = col.insert_one(deleted_message.to_dict())
-            logger.debug(f"Deleted message logged with _id: {result.inserted_id}")
+        return list(cursor)
     except Exception as e:
-        logger.error(f"Failed to write a deleted message to MongoDB: {e}")
+        logger.error(f"Failed to query deleted messages: {e}")
         return []
 
 
+def iter_messages_from_collection(
+    batch_size: int = CORPUS_BATCH_SIZE,
+    projection: dict | None = None,
+    query: dict | None = None,
+    database="discord_bot",
+    collection="messages",
+) -> Iterator[list[dict]]:
+    """
+    Streams chat message documents from MongoDB in batches, so the corpus never
+    has to fit in memory.
+
+    Args:
+        batch_size (int): Number of documents fetched per round trip and yielded at once
+        projection (dict): Fields to return, only "message" by default
+        query (dict): Query filter, every document by default
+        database (str): Name of the MongoDB database
+        collection (str): Name of the collection
+
+    Yields:
+        list: up to batch_size documents
+
+    Raises:
+        PyMongoError: if the stream fails, the batches yielded so far are not
+            the whole corpus then
+    """
+    if projection is None:
+        projection = {"_id": 0, "message": 1}
+
+    client = get_mongodb_client()
+    col = client[database][collection]
+
+    logger.debug(f"Using MongoDB DB='{database}', Collection='{collection}'")
+
+    with col.find(query or {}, projection, batch_size=batch_size) as cursor:
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
 def read_messages_from_collection(
     database="discord_bot",
     collection="messages",
@@ -61,35 +310,33 @@ def read_messages_from_collection(
     """
     Loads all chat messages from MongoDB.
 
+    Prefer iter_messages_from_collection, this builds a list of the whole corpus.
+
     Args:
-        mongo_uri (str): MongoDB connection URI
         database (str): Name of the MongoDB database
         collection (str): Name of the collection
 
     Returns:
         list: list of message strings
     """
-    mongo_uri = get_mongodb_uri()
-
     try:
-        with MongoClient(mongo_uri) as client:
-            db = client[database]
-            col = db[collection]
-
-            logger.debug(
-                f"Connecting to MongoDB at {mongo_uri}, DB='{database}', Collection='{collection}'"
+        messages = [
+            doc["message"]
+            for batch in iter_messages_from_collection(
+                database=database, collection=collection
             )
-
-            cursor = col.find({}, {"message": 1})
-            messages = [doc["message"] for doc in cursor if "message" in doc]
-
-            logger.info(f"Loaded {len(messages)} messages from MongoDB")
-
-            return messages
+            for doc in batch
+            if "message" in doc
+        ]
     except Exception as e:
+        # Never hand out part of the corpus as if it were all of it
         logger.error(f"Failed to load messages from MongoDB: {e}")
         return []
 
+    logger.info(f"Loaded {len(messages)} messages from MongoDB")
+
+    return messages
+
 
 def read_random_message_from_collection(
     database="discord_bot",
@@ -105,37 +352,65 @@ def read_random_message_from_collection(
     Returns:
         str or None: random message string, or None if collection is empty
     """
-    mongo_uri = get_mongodb_uri()
-
     try:
-        with MongoClient(mongo_uri) as client:
-            db = client[database]
-            col = db[collection]
+        client = get_mongodb_client()
+        db = client[database]
+        col = db[collection]
 
-            logger.debug(
-                f"Connecting to MongoDB at {mongo_uri}, DB='{database}', Collection='{collection}'"
-            )
+        logger.debug(f"Using MongoDB DB='{database}', Collection='{collection}'")
 
-            # Use aggregation with $sample to get a random document
-            pipeline = [{"$sample": {"size": 1}}]
+        # Use aggregation with $sample to get a random document
+        pipeline = [{"$sample": {"size": 1}}]
 
-            cursor = col.aggregate(pipeline)
-            # almost random
-            random_docs = list(cursor)
+        cursor = col.aggregate(pipeline)
+        # almost random
+        random_docs = list(cursor)
 
-            if random_docs and "message" in random_docs[0]:
-                message = random_docs[0]["message"]
-                logger.info(f"Loaded random message from MongoDB: {message[:100]}...")
-                return message
+        if random_docs and "message" in random_docs[0]:
+            message = random_docs[0]["message"]
+            logger.info(f"Loaded random message from MongoDB: {message[:100]}...")
+            return message
 
-            logger.warning("No messages found in collection")
-            return None
+        logger.warning("No messages found in collection")
+        return None
 
     except Exception as e:
         logger.error(f"Failed to load random message from MongoDB: {e}")
         return None
 
 
+def read_random_messages_from_collection(
+    size: int,
+    database="discord_bot",
+    collection="messages",
+):
+    """
+    Loads up to size random chat messages from MongoDB with a single $sample.
+
+    Args:
+        size (int): Number of messages to sample
+        database (str): Name of the MongoDB database
+        collection (str): Name of the collection
+
+    Returns:
+        list: list of message strings, empty if the collection is empty
+    """
+    try:
+        client = get_mongodb_client()
+        col = client[database][collection]
+
+        cursor = col.aggregate(
+            [{"$sample": {"size": size}}, {"$project": {"_id": 0, "message": 1}}]
+        )
+        messages = [doc["message"] for doc in cursor if "message" in doc]
+
+        logger.debug(f"Sampled {len(messages)} random messages from MongoDB")
+        return messages
+    except Exception as e:
+        logger.error(f"Failed to sample random messages from MongoDB: {e}")
+        return []
+
+
 def load_chat_messages_from_db():
     messages = []
 
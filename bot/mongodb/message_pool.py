@@ -0,0 +1,87 @@
+import asyncio
+from collections import deque
+
+from bot.log import logger
+
+from .aio import run_in_background, run_mongodb
+from .load_db import read_random_messages_from_collection
+
+RANDOM_POOL_SIZE = 50
+RANDOM_POOL_LOW_WATER = 10
+# Number of most recently served messages that are not served again
+RANDOM_REPEAT_HORIZON = 200
+
+
+class RandomMessagePool:
+    """
+    Serves random messages from memory, sampled from MongoDB in batches.
+
+    The pool is refilled in the background once it runs low, so callers only
+    wait on MongoDB when it is empty. Messages served within the last horizon
+    picks are skipped while refilling, unless the collection is too small to
+    offer anything else.
+    """
+
+    def __init__(
+        self,
+        size: int = RANDOM_POOL_SIZE,
+        low_water: int = RANDOM_POOL_LOW_WATER,
+        horizon: int = RANDOM_REPEAT_HORIZON,
+    ):
+        self.size = size
+        self.low_water = low_water
+
+        self._pool: deque[str] = deque()
+        self._recent: deque[str] = deque(maxlen=horizon)
+        self._refill_lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self._pool)
+
+    async def refill(self):
+        async with self._refill_lock:
+            if len(self._pool) >= self.low_water:
+                return
+
+            sampled = await run_mongodb(
+                read_random_messages_from_collection, self.size, default=[]
+            )
+
+            seen = set(self._recent)
+            seen.update(self._pool)
+            fresh = []
+            for message in sampled:
+                if message not in seen:
+                    seen.add(message)
+                    fresh.append(message)
+
+            if not fresh and not self._pool:
+                fresh = list(dict.fromkeys(sampled))
+
+            self._pool.extend(fresh)
+            logger.debug(
+                "Refilled random message pool with %d of %d sampled messages",
+                len(fresh),
+                len(sampled),
+            )
+
+    async def get(self) -> str | None:
+        if not self._pool:
+            await self.refill()
+            if not self._pool:
+                return None
+
+        message = self._pool.popleft()
+        self._recent.append(message)
+
+        if len(self._pool) < self.low_water:
+            run_in_background(self.refill())
+
+        return message
+
+
+random_message_pool = RandomMessagePool()
+
+
+async def get_random_message() -> str | None:
+    return await random_message_pool.get()
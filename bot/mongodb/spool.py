@@ -0,0 +1,130 @@
+import os
+from datetime import datetime
+
+from bot.log import logger
+from database.connection import PRAGMAS, Database
+
+from .load_db import DeletedMessage
+
+SPOOL_DIR = os.getenv("BOT_DATA_DIR", "/bot-data")
+SPOOL_PATH = os.path.join(SPOOL_DIR, "deleted_messages_spool.db")
+
+# Around 200 MiB with messages of maximum length
+MAX_SPOOLED_MESSAGES = 50_000
+REPLAY_BATCH_SIZE = 500
+
+# Every spooled message must survive a power loss, not only a crash
+SPOOL_PRAGMAS = PRAGMAS + ("PRAGMA synchronous = FULL",)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deleted_messages (
+    message_id INTEGER PRIMARY KEY,
+    channel_id INTEGER NOT NULL,
+    author_id INTEGER NOT NULL,
+    author_name TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    deleted_at TEXT NOT NULL
+);
+"""
+
+
+class DeletedMessageSpool:
+    """
+    Local, durable SQLite spool for deleted messages that could not be written
+    to MongoDB yet.
+
+    Messages are keyed on message_id, so spooling one twice is harmless. Once
+    max_messages are spooled the oldest messages are dropped to bound disk usage.
+    All methods are blocking and meant to be called through `run`.
+    """
+
+    def __init__(
+        self, path: str = SPOOL_PATH, max_messages: int = MAX_SPOOLED_MESSAGES
+    ):
+        self.max_messages = max_messages
+        self._db = Database(path, SPOOL_PRAGMAS)
+        self._initialized = False
+
+    def _initialize(self):
+        if not self._initialized:
+            with self._db.cursor() as cursor:
+                cursor.executescript(SCHEMA)
+            self._initialized = True
+
+    async def run(self, func, *args):
+        return await self._db.run(func, *args)
+
+    def count(self) -> int:
+        self._initialize()
+        with self._db.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM deleted_messages")
+            return cursor.fetchone()[0]
+
+    def append(self, deleted_messages: list[DeletedMessage]):
+        self._initialize()
+        with self._db.transaction() as cursor:
+            cursor.executemany(
+                "INSERT OR IGNORE INTO deleted_messages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        m.message_id,
+                        m.channel_id,
+                        m.author_id,
+                        m.author_name,
+                        m.content,
+                        m.timestamp.isoformat(),
+                        m.deleted_at.isoformat(),
+                    )
+                    for m in deleted_messages
+                ],
+            )
+
+            cursor.execute("SELECT COUNT(*) FROM deleted_messages")
+            overflow = cursor.fetchone()[0] - self.max_messages
+            if overflow > 0:
+                # Message ids are snowflakes, the lowest ones are the oldest
+                cursor.execute(
+                    "DELETE FROM deleted_messages WHERE message_id IN "
+                    "(SELECT message_id FROM deleted_messages ORDER BY message_id LIMIT ?)",
+                    (overflow,),
+                )
+                logger.warning(
+                    "Deleted message spool is full, dropped %d oldest messages",
+                    overflow,
+                )
+
+    def peek(self, limit: int) -> list[DeletedMessage]:
+        """Returns up to limit of the oldest spooled messages without removing them."""
+        self._initialize()
+        with self._db.cursor() as cursor:
+            cursor.execute(
+                "SELECT * FROM deleted_messages ORDER BY message_id LIMIT ?", (limit,)
+            )
+            rows = cursor.fetchall()
+
+        return [
+            DeletedMessage(
+                message_id=row[0],
+                channel_id=row[1],
+                author_id=row[2],
+                author_name=row[3],
+                content=row[4],
+                timestamp=datetime.fromisoformat(row[5]),
+                deleted_at=datetime.fromisoformat(row[6]),
+            )
+            for row in rows
+        ]
+
+    def remove(self, message_ids: list[int]):
+        with self._db.transaction() as cursor:
+            cursor.executemany(
+                "DELETE FROM deleted_messages WHERE message_id = ?",
+                [(message_id,) for message_id in message_ids],
+            )
+
+    def close(self):
+        self._db.close()
+
+
+deleted_message_spool = DeletedMessageSpool()
@@ -0,0 +1,61 @@
+import time
+from collections import OrderedDict, deque
+
+MAX_TRACKED_USERS = 20_000
+
+
+class SlidingWindowLimiter:
+    """
+    Per-key sliding window counter: a key is over the limit once the weights
+    it recorded within the last window seconds add up to more than limit.
+
+    Keys are kept in order of last activity, so idle keys are evicted from the
+    front on every update. Each key keeps at most limit + 1 events, as every
+    event weighs at least 1, which bounds memory per key as well.
+    """
+
+    def __init__(self, limit: int, window: float, max_keys: int = MAX_TRACKED_USERS):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        # key -> (events as (timestamp, weight), total weight)
+        self._keys: OrderedDict[int, list] = OrderedDict()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def hit(self, key: int, weight: int = 1, now: float | None = None) -> bool:
+        """Records weight for key and returns whether it is over the limit."""
+        if weight <= 0:
+            return False
+        if now is None:
+            now = time.monotonic()
+
+        self._evict(now)
+
+        entry = self._keys.get(key)
+        if entry is None:
+            entry = self._keys[key] = [deque(), 0]
+        else:
+            self._keys.move_to_end(key)
+
+        events = entry[0]
+        events.append((now, weight))
+        entry[1] += weight
+
+        cutoff = now - self.window
+        while events and (events[0][0] <= cutoff or len(events) > self.limit + 1):
+            entry[1] -= events.popleft()[1]
+
+        return entry[1] > self.limit
+
+    def reset(self, key: int):
+        self._keys.pop(key, None)
+
+    def _evict(self, now: float):
+        cutoff = now - self.window
+        while self._keys:
+            events = next(iter(self._keys.values()))[0]
+            if events[-1][0] > cutoff and len(self._keys) < self.max_keys:
+                break
+            self._keys.popitem(last=False)
@@ -0,0 +1,156 @@
+import re
+import time
+from dataclasses import dataclass
+
+from bot.log import logger
+from bot.metrics import Histogram
+
+# A single scan over the content finds every feature the rules look at. Only
+# the image extensions are matched case-insensitively.
+FEATURE_PATTERN = re.compile(
+    r"(?P<image>(?i:\.(?:jpg|jpeg|png|gif|webp|bmp)\b))"
+    r"|(?P<url>http)"
+    r"|(?P<everyone>@everyone|@here)"
+)
+
+
+@dataclass(slots=True)
+class MessageFeatures:
+    author_id: int
+    channel_id: int
+    mention_count: int
+    # Users mentioned in the content itself, without the author of a reply
+    explicit_mention_count: int
+    embed_count: int
+    attachment_count: int
+    attachment_extensions: frozenset[str]
+    image_link_count: int
+    url_count: int
+    mentions_everyone: bool
+    has_content: bool
+
+    @property
+    def has_url(self) -> bool:
+        return self.url_count > 0
+
+    @classmethod
+    def from_message(cls, message) -> "MessageFeatures":
+        content = message.content
+        image_link_count = 0
+        url_count = 0
+        mentions_everyone = False
+
+        explicit_mentions = set(message.raw_mentions)
+        if message.reference is not None:
+            replied_author = getattr(message.reference.resolved, "author", None)
+            if replied_author is not None:
+                explicit_mentions.discard(replied_author.id)
+
+        for match in FEATURE_PATTERN.finditer(content):
+            group = match.lastgroup
+            if group == "image":
+                image_link_count += 1
+            elif group == "url":
+                url_count += 1
+            else:
+                mentions_everyone = True
+
+        return cls(
+            author_id=message.author.id,
+            channel_id=message.channel.id,
+            mention_count=len(message.mentions),
+            explicit_mention_count=len(explicit_mentions),
+            embed_count=len(message.embeds),
+            attachment_count=len(message.attachments),
+            attachment_extensions=frozenset(
+                "." + attachment.filename.rpartition(".")[2]
+                for attachment in message.attachments
+                if "." in attachment.filename
+            ),
+            image_link_count=image_link_count,
+            url_count=url_count,
+            mentions_everyone=mentions_everyone,
+            has_content=bool(content.strip()),
+        )
+
+
+class Rule:
+    """
+    A moderation rule applied to incoming messages.
+
+    `when` is a cheap check on the message features that decides whether the
+    rule runs at all. The rule itself returns True when it acted on the
+    message, which stops the pipeline unless the rule is not final.
+    """
+
+    def __init__(self, name, func, priority: int, when=None, final: bool = True):
+        self.name = name
+        self.func = func
+        self.priority = priority
+        self.when = when
+        self.final = final
+
+        self.evaluated = 0
+        self.hits = 0
+        self.latency = Histogram()
+
+    async def __call__(self, message, features: MessageFeatures) -> bool:
+        self.evaluated += 1
+        start = time.perf_counter()
+        try:
+            hit = await self.func(message, features)
+        finally:
+            self.latency.observe((time.perf_counter() - start) * 1000)
+
+        if hit:
+            self.hits += 1
+        return bool(hit)
+
+
+class RulePipeline:
+    """Runs registered rules against a message in priority order, lowest first."""
+
+    def __init__(self):
+        self.rules: list[Rule] = []
+        self.messages = 0
+        self.latency = Histogram()
+
+    def rule(self, name: str, priority: int, when=None, final: bool = True):
+        """Decorator registering an async rule function."""
+
+        def decorator(func):
+            self.rules.append(Rule(name, func, priority, when, final))
+            self.rules.sort(key=lambda rule: rule.priority)
+            return func
+
+        return decorator
+
+    async def run(self, message) -> Rule | None:
+        """Returns the rule that stopped the pipeline, if any."""
+        start = time.perf_counter()
+        features = MessageFeatures.from_message(message)
+        try:
+            for rule in self.rules:
+                if rule.when is not None and not rule.when(features):
+                    continue
+                if await rule(message, features) and rule.final:
+                    return rule
+            return None
+        finally:
+            self.messages += 1
+            self.latency.observe((time.perf_counter() - start) * 1000)
+
+    def log_stats(self):
+        logger.info(
+            "Rule pipeline: %d messages, latency (ms) %s",
+            self.messages,
+            self.latency.summary(),
+        )
+        for rule in self.rules:
+            logger.info(
+                "Rule %s: %d evaluated, %d hits, latency (ms) %s",
+                rule.name,
+                rule.evaluated,
+                rule.hits,
+                rule.latency.summary(),
+            )
@@ -1,4 +1,5 @@
 import random
+import time
 from datetime import datetime, timezone
 
 import discord
@@ -7,8 +8,12 @@ from discord.ext import commands, tasks
 
 from bot.log import logger
 from bot.utils import aware_utcnow, fetch_api_data
-from bot.mongodb import read_random_message_from_collection
-from database import migrate_users_with_role
+from bot.mongodb import (
+    archive_old_deleted_messages,
+    get_random_message,
+    replay_spool,
+)
+from database import reconcile_role_members_async
 
 TARGET_DATE = datetime(2036, 8, 12, tzinfo=timezone.utc)
 OFFTOPIC_CHANNEL = 1112048063448617142
@@ -27,13 +32,22 @@ DEMENTIA_URL = "https://cdn.discordapp.com/attachments/1112048063448617142/13769
 
 
 async def migrate_all_users(bot):
-    # Fetch users with the SPAM_ROLE_ID and migrate them to the database
+    # Fetch users with the SPAM_ROLE_ID and record the ones missing from the database
     guild = discord.utils.get(bot.guilds)
     if guild:
         spam_role = discord.utils.get(guild.roles, id=SPAM_ROLE_ID)
         if spam_role:
-            for member in spam_role.members:
-                migrate_users_with_role(member.id, SPAM_ROLE_ID, member.name)
+            start = time.perf_counter()
+            members = [(member.id, member.name) for member in spam_role.members]
+            inserted, skipped = await reconcile_role_members_async(
+                SPAM_ROLE_ID, members
+            )
+            logger.info(
+                "Reconciled spam role members in %.1f ms: %d inserted, %d already stored",
+                (time.perf_counter() - start) * 1000,
+                inserted,
+                skipped,
+            )
 
 
 class SteamSaleChecker(commands.Cog):
@@ -168,7 +182,7 @@ async def setup(bot):
     async def shizo_message():
         channel = bot.get_channel(OFFTOPIC_CHANNEL)
         if channel:
-            message = read_random_message_from_collection()
+            message = await get_random_message()
             if message:
                 await channel.send(message)
             else:
@@ -185,12 +199,22 @@ async def setup(bot):
         else:
             logger.error("Channel not found. Check the OFFTOPIC_CHANNEL variable.")
 
+    @tasks.loop(minutes=1)
+    async def replay_deleted_messages():
+        await replay_spool()
+
+    @tasks.loop(hours=24)
+    async def archive_deleted_messages():
+        await archive_old_deleted_messages()
+
     await migrate_all_users(bot)
 
     update_status.start()
     heat_death.start()
     shizo_message.start()
     share_dementia_image.start()
+    replay_deleted_messages.start()
+    archive_deleted_messages.start()
 
     await bot.add_cog(SteamSaleChecker(bot))
 
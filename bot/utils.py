@@ -59,10 +59,18 @@ async def timeout_member(
     member: discord.Member,
     duration: timedelta = timedelta(minutes=1),
     reason: str = "Requested by the bot",
-):
+    raise_rate_limited: bool = False,
+) -> bool:
+    """
+    Times out member, logging any failure. With raise_rate_limited, rate limit
+    errors are raised instead so the caller can retry.
+
+    Returns:
+        bool: True if the member was timed out
+    """
     if not member:
         logger.error("Member is None. Skipping timeout.")
-        return
+        return False
 
     try:
         # Debug: Print the member object and timeout duration
@@ -72,13 +80,21 @@ async def timeout_member(
 
         await member.timeout(duration, reason=reason)
         logger.info(f"Successfully timed out {member}.")
+        return True
 
     except discord.Forbidden:
         logger.error(f"Bot lacks permissions to timeout member {member}.")
     except discord.HTTPException as e:
+        if raise_rate_limited and e.status == 429:
+            raise
         logger.error("HTTPException occurred: %s", e)
+    except discord.RateLimited as e:
+        if raise_rate_limited:
+            raise
+        logger.error("Rate limited for %.1fs: %s", e.retry_after, e)
     except Exception as e:
         logger.error("Unexpected error occurred: %s", e)
+    return False
 
 
 # Check if a username is valid
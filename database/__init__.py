@@ -1,158 +1,324 @@
 import os
-import sqlite3
+import re
 
 from bot.log import logger
 from bot.utils import aware_utcnow
 
+from .akas import AkaPrefixIndex, trigram_query
+from .connection import Database
+from .migrations import apply_migrations
+from .patterns import MemePatternCache, compile_meme_pattern
+from .write_queue import WriteBehindQueue
+
 DB_DIR = os.getenv("BOT_DATA_DIR", "/bot-data")
 DB_PATH = os.path.join(DB_DIR, "database.db")
 
 os.makedirs(DB_DIR, exist_ok=True)
 
+db = Database(DB_PATH)
+
+# Non-critical writes (role assignments, blacklist, AKA and pattern additions)
+# are batched here. Every function reading those tables from the database drains
+# it first, and in-memory state is updated when the write is queued.
+pending_writes = WriteBehindQueue(db)
+
+meme_patterns = MemePatternCache()
+
+aka_index = AkaPrefixIndex()
+
+# In-memory mirrors of the small membership tables. They are only ever changed
+# through the functions below, which queue the matching database write.
+role_user_ids: set[int] = set()
+blacklisted_user_ids: set[int] = set()
+
 
 def initialize_db():
-    """Creates the database tables if they don't exist."""
+    """Creates the database tables if they don't exist and migrates them."""
     logger.info("Opening database: %s", DB_PATH)
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
 
     with open(os.path.join(os.path.dirname(__file__), "schema.sql"), "r") as f:
-        cursor.executescript(f.read())
+        schema = f.read()
+
+    with db.cursor() as cursor:
+        cursor.executescript(schema)
 
-    conn.commit()
-    conn.close()
+    apply_migrations(db)
+
+    load_meme_patterns()
+    load_membership_sets()
+    load_aka_index()
 
     logger.info("Done loading database: %s", DB_PATH)
 
 
+def close_db():
+    """Writes queued changes, waits for pending queries and closes the connection."""
+    pending_writes.drain()
+    db.close()
+
+
 def add_meme_pattern(regex: str, response: str):
     """Adds a new pattern to the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
 
-    cursor.execute(
-        "INSERT INTO message_patterns (regex, response) VALUES (?, ?)",
-        (regex, response),
-    )
-    conn.commit()
-    conn.close()
+    # The pattern id is only known once the row is written, and the cache is
+    # only updated once it is committed
+    def write(cursor):
+        cursor.execute(
+            "INSERT INTO message_patterns (regex, response) VALUES (?, ?)",
+            (regex, response),
+        )
+        pattern_id = cursor.lastrowid
+        pending_writes.after_commit(
+            lambda: meme_patterns.add(pattern_id, regex, response)
+        )
+
+    pending_writes.submit(write)
 
 
 def get_meme_patterns():
     """Fetches all regex-response pairs from the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT regex, response FROM message_patterns")
-    patterns = cursor.fetchall()
-    conn.close()
+    pending_writes.drain()
+    with db.cursor() as cursor:
+        cursor.execute("SELECT regex, response FROM message_patterns")
+        patterns = cursor.fetchall()
 
     return [{"regex": row[0], "response": row[1]} for row in patterns]
 
 
 def remove_meme_pattern(pattern_id: int):
     """Removes a pattern by ID."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    pending_writes.drain()
+    with db.transaction() as cursor:
+        cursor.execute("DELETE FROM message_patterns WHERE id = ?", (pattern_id,))
+
+    meme_patterns.remove(pattern_id)
 
-    cursor.execute("DELETE FROM message_patterns WHERE id = ?", (pattern_id,))
-    conn.commit()
-    conn.close()
 
+def load_meme_patterns():
+    """Loads and compiles all meme patterns into the process-wide cache."""
+    with db.cursor() as cursor:
+        cursor.execute("PRAGMA data_version")
+        version = cursor.fetchone()[0]
+        cursor.execute("SELECT id, regex, response FROM message_patterns")
+        rows = cursor.fetchall()
 
-def migrate_users_with_role(user_id: int, role_id: int, user_name: str):
-    """Migrates existing users with the role to the new table."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    meme_patterns.load(rows, version)
 
-    cursor.execute(
-        "INSERT OR IGNORE INTO user_roles (user_id, role_id, date_assigned, user_name) VALUES (?, ?, ?, ?)",
-        (user_id, role_id, aware_utcnow().isoformat(), user_name),
+
+def refresh_meme_patterns():
+    """
+    Reloads the meme pattern cache if another connection changed the database
+    since it was loaded. Our own writes keep the cache up to date in place.
+    """
+    pending_writes.drain()
+    with db.cursor() as cursor:
+        cursor.execute("PRAGMA data_version")
+        version = cursor.fetchone()[0]
+
+    if version != meme_patterns.version:
+        load_meme_patterns()
+    else:
+        # Rebuild here rather than on the event loop if our own writes changed it
+        meme_patterns.prepare()
+
+
+def is_valid_meme_pattern(regex: str) -> bool:
+    try:
+        compile_meme_pattern(regex)
+    except re.error:
+        return False
+    return True
+
+
+def load_membership_sets():
+    """Loads the role and blacklist tables into their in-memory sets."""
+    with db.cursor() as cursor:
+        cursor.execute("SELECT user_id FROM user_roles")
+        role_ids = {row[0] for row in cursor}
+        cursor.execute("SELECT user_id FROM black_list")
+        blacklist_ids = {row[0] for row in cursor}
+
+    role_user_ids.clear()
+    role_user_ids.update(role_ids)
+    blacklisted_user_ids.clear()
+    blacklisted_user_ids.update(blacklist_ids)
+
+    logger.info(
+        "Loaded %d role assignments and %d blacklisted users",
+        len(role_user_ids),
+        len(blacklisted_user_ids),
     )
 
-    conn.commit()
-    conn.close()
 
+def reconcile_role_members(role_id: int, members) -> tuple[int, int]:
+    """
+    Records every (user_id, user_name) member of a role that is missing from
+    the database, in a single transaction.
 
-def add_user_to_role(user_id: int, role_id: int, user_name: str):
-    """Adds a new user when they receive the role."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    Returns:
+        tuple: number of rows inserted and number of members already known
+    """
+    date_assigned = aware_utcnow().isoformat()
+    missing = [
+        (user_id, role_id, date_assigned, user_name)
+        for user_id, user_name in members
+        if user_id not in role_user_ids
+    ]
+    skipped = len(members) - len(missing)
 
-    cursor.execute(
-        "INSERT OR REPLACE INTO user_roles (user_id, role_id, date_assigned, user_name) VALUES (?, ?, ?, ?)",
-        (user_id, role_id, aware_utcnow().isoformat(), user_name),
-    )
+    if missing:
+        with db.transaction() as cursor:
+            cursor.executemany(
+                "INSERT OR IGNORE INTO user_roles (user_id, role_id, date_assigned, user_name) VALUES (?, ?, ?, ?)",
+                missing,
+            )
 
-    conn.commit()
-    conn.close()
+        role_user_ids.update(row[0] for row in missing)
 
+    return len(missing), skipped
 
-def user_has_role(user_id: int) -> bool:
-    """Checks if a user is in the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
 
-    cursor.execute("SELECT 1 FROM user_roles WHERE user_id = ?", (user_id,))
-    result = cursor.fetchone()
+def add_user_to_role(user_id: int, role_id: int, user_name: str):
+    """Adds a new user when they receive the role."""
+    row = (user_id, role_id, aware_utcnow().isoformat(), user_name)
+    role_user_ids.add(user_id)
+    pending_writes.submit(
+        lambda cursor: cursor.execute(
+            "INSERT OR REPLACE INTO user_roles (user_id, role_id, date_assigned, user_name) VALUES (?, ?, ?, ?)",
+            row,
+        ),
+        key=("user_roles", user_id),
+    )
 
-    conn.close()
 
-    return result is not None
+def user_has_role(user_id: int) -> bool:
+    """Checks if a user is in the database."""
+    return user_id in role_user_ids
 
 
 def add_user_to_blacklist(user_id: int, reason: str):
     """Adds a user to the blacklist."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "INSERT OR IGNORE INTO black_list (user_id, date_assigned, reason) VALUES (?, ?, ?)",
-        (user_id, aware_utcnow().isoformat(), reason),
+    # The first reason is kept, like INSERT OR IGNORE does
+    if user_id in blacklisted_user_ids:
+        return
+
+    row = (user_id, aware_utcnow().isoformat(), reason)
+    blacklisted_user_ids.add(user_id)
+    pending_writes.submit(
+        lambda cursor: cursor.execute(
+            "INSERT OR IGNORE INTO black_list (user_id, date_assigned, reason) VALUES (?, ?, ?)",
+            row,
+        )
     )
 
-    conn.commit()
-    conn.close()
-
 
 def is_user_blacklisted(user_id: int) -> bool:
     """Checks if a user is on the blacklist."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    return user_id in blacklisted_user_ids
+
+
+def add_aka_response(aka: str, response: str) -> None:
+    """
+    Insert a new AKA/response pair into the database, replacing the response
+    of an existing AKA that only differs in case.
+    """
+    aka_index.add(aka)
+    pending_writes.submit(
+        lambda cursor: cursor.execute(
+            "INSERT INTO aka_list (aka, response) VALUES (?, ?) "
+            "ON CONFLICT (aka COLLATE NOCASE) DO UPDATE SET response = excluded.response",
+            (aka, response),
+        ),
+        key=("aka_list", aka.lower()),
+    )
 
-    cursor.execute("SELECT 1 FROM black_list WHERE user_id = ?", (user_id,))
-    result = cursor.fetchone()
 
-    conn.close()
+def search_aka(keyword: str) -> str | None:
+    pending_writes.drain()
+    with db.cursor() as cursor:
+        # Exact match (case-insensitive), served by idx_aka_list_aka
+        cursor.execute(
+            "SELECT response FROM aka_list WHERE aka = ? COLLATE NOCASE LIMIT 1",
+            (keyword,),
+        )
+        row = cursor.fetchone()
 
-    return result is not None
+    return row[0] if row else None
 
 
-def add_aka_response(aka: str, response: str) -> None:
+def search_aka_fuzzy(keyword: str, limit: int = 5) -> tuple[str | None, list[str]]:
     """
-    Insert a new AKA/response pair into the database.
+    Looks up an AKA through the case-insensitive unique index, and only if there
+    is no such AKA, looks for similar ones on the aka_fts trigram index. Keywords
+    too short to share trigrams fall back to AKAs starting with the same letters.
+
+    Returns:
+        tuple: response of the exact (case-insensitive) match or None, and up to
+        limit other AKAs ranked by similarity if there is no match
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    response = search_aka(keyword)
+    if response is not None:
+        return response, []
 
-    cursor.execute(
-        "INSERT INTO aka_list (aka, response) VALUES (?, ?)", (aka, response)
-    )
+    suggestions = []
+    query = trigram_query(keyword)
+    if query is not None:
+        with db.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT aka_list.aka
+                FROM aka_fts JOIN aka_list ON aka_list.id = aka_fts.rowid
+                WHERE aka_fts MATCH ?
+                ORDER BY aka_fts.rank
+                LIMIT ?
+                """,
+                (query, limit),
+            )
+            suggestions = [row[0] for row in cursor]
 
-    conn.commit()
-    conn.close()
+    if len(suggestions) < limit:
+        for aka in aka_index.complete(keyword[: max(2, len(keyword) // 2)]):
+            if aka not in suggestions:
+                suggestions.append(aka)
 
+    return None, suggestions[:limit]
 
-def search_aka(keyword: str) -> str | None:
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
 
-    # Exact match (case-insensitive)
-    cursor.execute(
-        "SELECT response FROM aka_list WHERE LOWER(aka) = LOWER(?) LIMIT 1", (keyword,)
-    )
+def load_aka_index():
+    """Loads all AKA names into the in-memory prefix index."""
+    with db.cursor() as cursor:
+        cursor.execute("SELECT aka FROM aka_list")
+        aka_index.load(row[0] for row in cursor)
 
-    row = cursor.fetchone()
-    conn.close()
+    logger.info("Loaded %d AKAs", len(aka_index))
 
-    return row[0] if row else None
+
+def complete_aka(prefix: str, limit: int = 25) -> list[str]:
+    """Returns AKA names starting with prefix, answered from memory."""
+    return aka_index.complete(prefix, limit)
+
+
+# Async variants, to be awaited from event handlers and commands. They run the
+# functions above on the database worker thread so the event loop never blocks
+# on disk I/O. Queued writes need no variant, submitting them never blocks.
+
+
+async def reconcile_role_members_async(role_id: int, members) -> tuple[int, int]:
+    return await db.run(reconcile_role_members, role_id, members)
+
+
+async def search_aka_fuzzy_async(
+    keyword: str, limit: int = 5
+) -> tuple[str | None, list[str]]:
+    return await db.run(search_aka_fuzzy, keyword, limit)
+
+
+async def flush_pending_writes():
+    """Writes all queued changes, e.g. before shutting down."""
+    await pending_writes.flush()
+
+
+async def match_meme_pattern_async(text: str) -> str | None:
+    """Returns the response of the first meme pattern matching text."""
+    await db.run(refresh_meme_patterns)
+    return meme_patterns.match(text)
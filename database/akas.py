@@ -0,0 +1,53 @@
+from bisect import bisect_left, insort
+
+
+def fold_aka(aka: str) -> str:
+    return aka.casefold()
+
+
+def trigram_query(keyword: str) -> str | None:
+    """
+    Builds an FTS5 query matching any trigram of keyword, so the best ranked
+    rows are the ones sharing the most trigrams with it.
+    """
+    folded = keyword.lower()
+    trigrams = dict.fromkeys(folded[i : i + 3] for i in range(len(folded) - 2))
+    if not trigrams:
+        return None
+    return " OR ".join('"{}"'.format(t.replace('"', '""')) for t in trigrams)
+
+
+class AkaPrefixIndex:
+    """
+    Sorted, case-insensitive index of AKA names answering prefix queries with a
+    binary search, fast enough for slash command autocomplete.
+    """
+
+    def __init__(self):
+        # Sorted (folded, original) pairs
+        self._entries: list[tuple[str, str]] = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self, akas):
+        entries = {fold_aka(aka): aka for aka in akas}
+        self._entries = sorted(entries.items())
+
+    def add(self, aka: str):
+        folded = fold_aka(aka)
+        index = bisect_left(self._entries, (folded,))
+        if index < len(self._entries) and self._entries[index][0] == folded:
+            return
+        insort(self._entries, (folded, aka))
+
+    def complete(self, prefix: str, limit: int = 25) -> list[str]:
+        """Returns up to limit AKAs starting with prefix, in alphabetical order."""
+        folded = fold_aka(prefix)
+        index = bisect_left(self._entries, (folded,))
+        matches = []
+        for key, aka in self._entries[index : index + limit]:
+            if not key.startswith(folded):
+                break
+            matches.append(aka)
+        return matches
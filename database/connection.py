@@ -0,0 +1,88 @@
+import asyncio
+import functools
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from bot.log import logger
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",  # 16 MiB
+    "PRAGMA mmap_size = 67108864",  # 64 MiB
+    "PRAGMA busy_timeout = 5000",
+)
+
+
+class Database:
+    """
+    A single long-lived SQLite connection.
+
+    Queries are serialized through a lock, so the connection can be used from
+    the dedicated worker thread (see `run`) as well as from synchronous callers.
+    """
+
+    def __init__(self, path: str, pragmas=PRAGMAS):
+        self.path = path
+        self.pragmas = pragmas
+        self._conn = None
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # Transactions are managed explicitly by `transaction`
+            conn = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            for pragma in self.pragmas:
+                conn.execute(pragma)
+            self._conn = conn
+            logger.info("Opened database connection: %s", self.path)
+
+        return self._conn
+
+    @contextmanager
+    def cursor(self):
+        """Yields a cursor for read-only statements."""
+        with self._lock:
+            cursor = self._connect().cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    @contextmanager
+    def transaction(self):
+        """Yields a cursor inside a transaction that commits on success."""
+        with self._lock:
+            cursor = self._connect().cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            else:
+                cursor.execute("COMMIT")
+            finally:
+                cursor.close()
+
+    async def run(self, func, *args, **kwargs):
+        """Runs a blocking database function on the worker thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            if self._conn is not None:
+                self._conn.execute("PRAGMA optimize")
+                self._conn.close()
+                self._conn = None
+                logger.info("Closed database connection: %s", self.path)
@@ -0,0 +1,7 @@
+-- AKAs are looked up case-insensitively and must be unique. Keep the oldest
+-- row of any duplicates, which is the one lookups used to return.
+DELETE FROM aka_list WHERE id NOT IN (
+    SELECT MIN(id) FROM aka_list GROUP BY aka COLLATE NOCASE
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_aka_list_aka ON aka_list (aka COLLATE NOCASE);
@@ -0,0 +1,23 @@
+-- Trigram full-text index over AKA names, used for fuzzy /aka lookups.
+-- It is an external content table kept in sync with aka_list by triggers.
+CREATE VIRTUAL TABLE IF NOT EXISTS aka_fts USING fts5(
+    aka,
+    content = 'aka_list',
+    content_rowid = 'id',
+    tokenize = 'trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS aka_list_fts_insert AFTER INSERT ON aka_list BEGIN
+    INSERT INTO aka_fts (rowid, aka) VALUES (new.id, new.aka);
+END;
+
+CREATE TRIGGER IF NOT EXISTS aka_list_fts_delete AFTER DELETE ON aka_list BEGIN
+    INSERT INTO aka_fts (aka_fts, rowid, aka) VALUES ('delete', old.id, old.aka);
+END;
+
+CREATE TRIGGER IF NOT EXISTS aka_list_fts_update AFTER UPDATE OF aka ON aka_list BEGIN
+    INSERT INTO aka_fts (aka_fts, rowid, aka) VALUES ('delete', old.id, old.aka);
+    INSERT INTO aka_fts (rowid, aka) VALUES (new.id, new.aka);
+END;
+
+INSERT INTO aka_fts (aka_fts) VALUES ('rebuild');
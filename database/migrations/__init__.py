@@ -0,0 +1,75 @@
+import os
+import re
+import time
+
+from bot.log import logger
+
+MIGRATIONS_DIR = os.path.dirname(__file__)
+
+# Migration files are named NNNN_description.sql and applied in order
+MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+
+def list_migrations() -> list[tuple[int, str, str]]:
+    """Returns (version, name, path) for every migration file, sorted by version."""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append(
+                (
+                    int(match.group(1)),
+                    match.group(2),
+                    os.path.join(MIGRATIONS_DIR, filename),
+                )
+            )
+
+    return sorted(migrations)
+
+
+def apply_migrations(db):
+    """
+    Brings the database up to date, tracking progress in PRAGMA user_version.
+
+    Each migration runs in its own transaction together with the version bump,
+    so a failing migration leaves the database at the previous version.
+    """
+    with db.cursor() as cursor:
+        cursor.execute("PRAGMA user_version")
+        current = cursor.fetchone()[0]
+
+    pending = [m for m in list_migrations() if m[0] > current]
+    if not pending:
+        logger.info("Database schema is up to date (version %d)", current)
+        return
+
+    total_start = time.perf_counter()
+    for version, name, path in pending:
+        with open(path, "r") as f:
+            script = f.read()
+
+        start = time.perf_counter()
+        with db.cursor() as cursor:
+            try:
+                cursor.executescript(
+                    f"BEGIN IMMEDIATE;\n{script}\nPRAGMA user_version = {version};\nCOMMIT;"
+                )
+            except Exception:
+                if cursor.connection.in_transaction:
+                    cursor.execute("ROLLBACK")
+                logger.error("Database migration %04d_%s failed", version, name)
+                raise
+
+        logger.info(
+            "Applied database migration %04d_%s in %.1f ms",
+            version,
+            name,
+            (time.perf_counter() - start) * 1000,
+        )
+
+    logger.info(
+        "Migrated database from version %d to %d in %.1f ms",
+        current,
+        pending[-1][0],
+        (time.perf_counter() - total_start) * 1000,
+    )
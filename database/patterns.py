@@ -0,0 +1,275 @@
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+from bot.log import logger
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+_REPEATS = tuple(
+    op
+    for op in (
+        sre_parse.MAX_REPEAT,
+        sre_parse.MIN_REPEAT,
+        getattr(sre_parse, "POSSESSIVE_REPEAT", None),
+    )
+    if op is not None
+)
+_ATOMIC_GROUP = getattr(sre_parse, "ATOMIC_GROUP", None)
+
+# Non-ASCII characters that re.IGNORECASE treats as equal to an ASCII letter
+# but that str.lower() leaves alone
+_CASE_FIXES = str.maketrans({"ı": "i", "ſ": "s"})
+
+
+@dataclass(slots=True, frozen=True)
+class MemePattern:
+    id: int
+    regex: str
+    response: str
+    compiled: re.Pattern
+    # Strings of which at least one occurs in every match, see required_literals
+    literals: frozenset[str] | None
+
+
+def compile_meme_pattern(regex: str) -> re.Pattern:
+    """Compiles a meme regex the same way /meme matches it."""
+    return re.compile(regex, re.IGNORECASE)
+
+
+def make_meme_pattern(pattern_id: int, regex: str, response: str) -> MemePattern | None:
+    """Compiles a pattern row, returning None (and logging) if the regex is invalid."""
+    try:
+        compiled = compile_meme_pattern(regex)
+    except re.error as e:
+        logger.warning(
+            "Skipping invalid meme pattern %s (%s): %s", pattern_id, regex, e
+        )
+        return None
+
+    return MemePattern(pattern_id, regex, response, compiled, required_literals(regex))
+
+
+def fold_text(text: str) -> str:
+    """Folds case so required literals can be found with plain substring search."""
+    return text.lower().translate(_CASE_FIXES)
+
+
+def _selectivity(literals):
+    return min(len(literal) for literal in literals)
+
+
+def _required_literals(items) -> frozenset[str] | None:
+    """
+    Returns a set of lowercase strings of which at least one must occur in any
+    text the parsed pattern matches, or None if no such set could be derived.
+    """
+    candidates = []
+    run = []
+
+    def end_run():
+        if run:
+            candidates.append(frozenset(["".join(run)]))
+            run.clear()
+
+    for op, av in items:
+        if op is sre_parse.LITERAL and av < 128:
+            run.append(chr(av).lower())
+            continue
+
+        end_run()
+        if op is sre_parse.SUBPATTERN:
+            required = _required_literals(av[-1])
+        elif op is _ATOMIC_GROUP:
+            required = _required_literals(av)
+        elif op in _REPEATS and av[0] >= 1:
+            required = _required_literals(av[2])
+        elif op is sre_parse.BRANCH:
+            branches = [_required_literals(branch) for branch in av[1]]
+            if all(branches):
+                required = frozenset().union(*branches)
+            else:
+                required = None
+        else:
+            required = None
+
+        if required:
+            candidates.append(required)
+
+    end_run()
+    if not candidates:
+        return None
+    return max(candidates, key=_selectivity)
+
+
+def required_literals(regex: str) -> frozenset[str] | None:
+    try:
+        return _required_literals(sre_parse.parse(regex, re.IGNORECASE))
+    except Exception:
+        return None
+
+
+class _AhoCorasick:
+    """Finds which of a fixed set of strings occur in a text in a single pass."""
+
+    def __init__(self, words):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        for index, word in enumerate(words):
+            state = 0
+            for char in word:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = next_state
+            self._out[state] += (index,)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._out[next_state] += self._out[fail]
+
+    def search(self, text: str) -> set[int]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class MemePatternMatcher:
+    """
+    Matches text against many patterns at once.
+
+    Each pattern is reduced to the literals it cannot match without. One
+    Aho-Corasick pass over the input finds which literals occur, and only the
+    patterns owning them (plus those without any usable literal) are confirmed
+    with their regex, in id order.
+    """
+
+    def __init__(self, patterns: tuple[MemePattern, ...]):
+        self.patterns = patterns
+
+        literal_ids = {}
+        # literal index -> indexes into self.patterns
+        self._owners: list[list[int]] = []
+        self._unfiltered: list[int] = []
+
+        for index, pattern in enumerate(patterns):
+            literals = pattern.literals
+            if not literals:
+                self._unfiltered.append(index)
+                continue
+            for literal in literals:
+                literal_id = literal_ids.setdefault(literal, len(literal_ids))
+                if literal_id == len(self._owners):
+                    self._owners.append([])
+                self._owners[literal_id].append(index)
+
+        self._automaton = _AhoCorasick(literal_ids)
+
+    def match(self, text: str) -> MemePattern | None:
+        candidates = set(self._unfiltered)
+        for literal_id in self._automaton.search(fold_text(text)):
+            candidates.update(self._owners[literal_id])
+
+        for index in sorted(candidates):
+            pattern = self.patterns[index]
+            if pattern.compiled.search(text):
+                return pattern
+        return None
+
+
+class MemePatternCache:
+    """
+    Process-wide cache of precompiled meme patterns, ordered by id.
+
+    Adding or removing a pattern only marks the matcher stale, so a series of
+    edits costs one rebuild, done by `prepare` or the next `match`. A rebuilt
+    matcher replaces the old one instead of mutating it, so readers on the
+    event loop never observe a half-applied change made on the database thread.
+    `version` holds the SQLite data_version the cache was loaded at.
+    """
+
+    def __init__(self):
+        self._patterns: dict[int, MemePattern] = {}
+        self._matcher = MemePatternMatcher(())
+        # Bumped on every change, so a rebuild racing a change is not kept
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.version = None
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def _changed(self):
+        self._generation += 1
+        self._matcher = None
+
+    def load(self, rows, version):
+        patterns = {}
+        for pattern_id, regex, response in rows:
+            pattern = make_meme_pattern(pattern_id, regex, response)
+            if pattern:
+                patterns[pattern_id] = pattern
+
+        with self._lock:
+            self._patterns = patterns
+            self._changed()
+        self.prepare()
+        self.version = version
+        logger.info("Loaded %d meme patterns", len(patterns))
+
+    def add(self, pattern_id: int, regex: str, response: str):
+        pattern = make_meme_pattern(pattern_id, regex, response)
+        if pattern:
+            with self._lock:
+                self._patterns[pattern_id] = pattern
+                self._changed()
+
+    def remove(self, pattern_id: int):
+        with self._lock:
+            if self._patterns.pop(pattern_id, None) is not None:
+                self._changed()
+
+    def prepare(self) -> MemePatternMatcher:
+        """Returns the matcher, rebuilding it first if patterns changed."""
+        with self._lock:
+            matcher = self._matcher
+            if matcher is not None:
+                return matcher
+            patterns = tuple(sorted(self._patterns.values(), key=lambda p: p.id))
+            generation = self._generation
+
+        matcher = MemePatternMatcher(patterns)
+        with self._lock:
+            if self._generation == generation:
+                self._matcher = matcher
+        return matcher
+
+    def match(self, text: str) -> str | None:
+        """Returns the response of the first pattern (by id) matching text."""
+        pattern = self.prepare().match(text)
+        return pattern.response if pattern else None
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+
+from bot.log import logger
+
+WRITE_BATCH_SIZE = 100
+WRITE_DELAY = 0.5  # seconds
+
+
+class WriteBehindQueue:
+    """
+    Collects non-critical writes and commits them in batched transactions on
+    the database thread, after a short delay or once enough writes are pending.
+
+    Writes are callables taking a cursor. Writes submitted with the same key
+    coalesce, so only the latest one is executed. Without a running event loop
+    writes are executed immediately. A write can register `after_commit`
+    callbacks, which only run once its transaction committed.
+
+    Callers are expected to keep their in-memory state up to date at submit
+    time, and reads that go to the database must call `drain` first.
+    """
+
+    def __init__(
+        self, db, batch_size: int = WRITE_BATCH_SIZE, delay: float = WRITE_DELAY
+    ):
+        self._db = db
+        self.batch_size = batch_size
+        self.delay = delay
+
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        # Held while a batch is written, so batches commit in submission order
+        self._write_lock = threading.Lock()
+
+        self._timer = None
+        self._tasks = set()
+        # Callbacks registered by the writes of the transaction in progress
+        self._after_commit = []
+
+    def __len__(self):
+        return len(self._pending)
+
+    def submit(self, op, key=None):
+        with self._pending_lock:
+            if key is None:
+                key = object()
+            else:
+                self._pending.pop(key, None)
+            self._pending[key] = op
+            pending = len(self._pending)
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.drain()
+            return
+
+        if pending >= self.batch_size:
+            self._schedule_flush(loop)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.delay, self._schedule_flush, loop)
+
+    def after_commit(self, callback):
+        """
+        Runs callback once the transaction of the write calling this commits.
+        If it is rolled back, callback is dropped.
+        """
+        self._after_commit.append(callback)
+
+    def _schedule_flush(self, loop):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        task = loop.create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self):
+        """Writes everything pending on the database thread."""
+        await self._db.run(self.drain)
+
+    def drain(self) -> int:
+        """Synchronously writes everything pending. Returns the number of writes."""
+        with self._write_lock:
+            with self._pending_lock:
+                batch = list(self._pending.values())
+                self._pending.clear()
+
+            if not batch:
+                return 0
+
+            start = time.perf_counter()
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error(
+                    "Batched database write failed, retrying one by one: %s", e
+                )
+                self._write_individually(batch)
+
+            logger.debug(
+                "Wrote %d queued database writes in %.1f ms",
+                len(batch),
+                (time.perf_counter() - start) * 1000,
+            )
+            return len(batch)
+
+    def _write(self, batch):
+        """Executes batch in one transaction, then runs its commit callbacks."""
+        self._after_commit = []
+        try:
+            with self._db.transaction() as cursor:
+                for op in batch:
+                    op(cursor)
+            callbacks = self._after_commit
+        finally:
+            self._after_commit = []
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error("Database commit callback failed: %s", e)
+
+    def _write_individually(self, batch):
+        for op in batch:
+            try:
+                self._write([op])
+            except Exception as e:
+                logger.error("Dropping queued database write: %s", e)